@@ -2,20 +2,46 @@
 Main Flask application for the E-commerce Chatbot backend.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
+import numpy as np
 from datetime import datetime
+from functools import wraps
+import json
+import logging
 import os
 
 # Import our modules
 from models import db_manager, Product, User
-from auth import auth_manager
+from auth import auth_manager, user_required
+from hashing import password_hasher
 from chatbot import chatbot
+from pagination import encode_cursor, decode_cursor, count_rows
+from search_index import product_index, full_text_search
+from facets import facet_index
+from catalog import catalog_version, product_catalog
+from change_feed import change_feed
+from serialization import FastJSONProvider, parse_fields, product_serializer
+from metrics import request_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from structured_logging import structured_logging
+from slow_queries import slow_query_log
+
+logger = logging.getLogger('app')
+
+def reload_catalog():
+    """Build the in-memory product search index, catalog snapshot and vocabularies, dropping cached results."""
+    product_index.build()
+    product_catalog.build()
+    chatbot.refresh_vocabulary()
+    chatbot.search_cache.clear()
+    facet_index.clear()
+    catalog_version.bump()
 
 def create_app():
     """Create and configure Flask application."""
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -24,9 +50,29 @@ def create_app():
     # Enable CORS for frontend communication
     CORS(app, origins=['http://localhost:8080', 'http://127.0.0.1:8080', 'file://'])
     
+    # Queued JSON logging with a request id per request
+    structured_logging.init_app(app)
+    
     # Initialize authentication
     auth_manager.init_app(app)
     
+    # Per-route latency, status and SQL metrics
+    request_metrics.init_app(app, db_manager.engine)
+    
+    # Opt-in log of statements slower than SLOW_QUERY_MS
+    slow_query_log.instrument_engine(db_manager.engine)
+    
+    # Bump the version after every index, snapshot and cache has applied a product change,
+    # so a request never pairs the new ETag with old data
+    db_manager.add_product_listener(catalog_version.bump)
+    
+    # Note the change log position first so writes during the build are replayed, not missed
+    change_feed.mark_current()
+    reload_catalog()
+    
+    # Follow catalog writes made by other processes
+    change_feed.start(reload=reload_catalog)
+    
     return app
 
 app = create_app()
@@ -38,9 +84,30 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'search_cache': chatbot.get_cache_stats(),
+        'user_cache': auth_manager.get_cache_stats(),
+        'password_hashing': password_hasher.stats(),
+        'chat_write_behind': chatbot.get_write_behind_stats(),
+        'catalog_snapshot': product_catalog.stats(),
+        'catalog_changes': change_feed.stats(),
+        'logging': structured_logging.stats()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Request, SQL and stage metrics in Prometheus text format."""
+    return Response(request_metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/metrics/slow-queries', methods=['GET'])
+def slow_queries():
+    """Slow statements grouped by fingerprint, with their query plans."""
+    if not slow_query_log.enabled:
+        return jsonify({'error': 'Slow query log is disabled; set SLOW_QUERY_MS to enable it'}), 404
+    
+    limit = min(max(request.args.get('limit', default=20, type=int), 1), 500)
+    return jsonify(slow_query_log.summary(limit))
+
 # Authentication endpoints
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -63,7 +130,7 @@ def register():
         # Register user
         result, status_code = auth_manager.register_user(username, email, password)
         return jsonify(result), status_code
-        
+    
     except Exception as e:
         return jsonify({'error': f'Registration failed: {str(e)}'}), 500
 
@@ -85,53 +152,121 @@ def login():
         # Authenticate user
         result, status_code = auth_manager.login_user(username, password)
         return jsonify(result), status_code
-        
+    
     except Exception as e:
         return jsonify({'error': f'Login failed: {str(e)}'}), 500
 
 @app.route('/api/auth/me', methods=['GET'])
-@jwt_required()
-def get_current_user():
+@user_required
+def get_current_user(user):
     """Get current user information."""
     try:
-        user = auth_manager.get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
         return jsonify({
             'user': user,
             'message': 'User information retrieved successfully'
         })
-        
+    
     except Exception as e:
         return jsonify({'error': f'Failed to get user info: {str(e)}'}), 500
 
+def matching_values(field, text):
+    """Get catalog categories or brands containing text, case-insensitively.
+    
+    Filtering with IN on these values keeps the substring semantics of
+    ilike('%text%') while letting SQLite search the column's index. The
+    values come from the facet index rather than a SELECT DISTINCT.
+    """
+    text = text.lower()
+    values = facet_index.categories() if field == 'category' else facet_index.brands()
+    return [value for value, count in values if text in value.lower()]
+
+def flag_arg(name):
+    """Parse an optional boolean query parameter: true/1 or false/0, None when absent.
+    
+    Raises ValueError for anything else; request.args.get(name, type=bool)
+    would read "false" as True.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ('true', '1'):
+        return True
+    if value in ('false', '0'):
+        return False
+    raise ValueError(f'{name} must be true, false, 1 or 0')
+
+# Seconds browsers and CDNs may reuse catalog responses before revalidating
+CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', 60))
+
+# Serve product listings and lookups from the in-memory catalog snapshot instead of SQL
+CATALOG_SNAPSHOT_READS = os.environ.get('CATALOG_SNAPSHOT_READS', 'true').lower() == 'true'
+
+def catalog_cached(view):
+    """Add catalog-version ETag validation and Cache-Control to a product read endpoint.
+    
+    A request whose If-None-Match carries the current ETag gets a 304 before
+    the view runs, skipping the database and JSON serialization.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Read the version before the view so a concurrent write can only make the ETag stale
+        etag, modified_at = catalog_version.snapshot()
+        
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.last_modified = modified_at
+        response.cache_control.public = True
+        response.cache_control.max_age = CATALOG_CACHE_MAX_AGE
+        return response
+    return wrapper
+
 # Product endpoints
 @app.route('/api/products', methods=['GET'])
+@catalog_cached
 def get_products():
     """Get all products with optional filtering."""
+    session = None
     try:
-        session = db_manager.get_session()
-        
         # Get query parameters
         category = request.args.get('category')
         brand = request.args.get('brand')
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
-        featured = request.args.get('featured', type=bool)
-        on_sale = request.args.get('on_sale', type=bool)
+        featured = flag_arg('featured')
+        on_sale = flag_arg('on_sale')
         limit = request.args.get('limit', default=50, type=int)
         offset = request.args.get('offset', default=0, type=int)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', default='false').lower() == 'true'
+        if limit < 1 or offset < 0:
+            raise ValueError('limit must be at least 1 and offset cannot be negative')
+        
+        fields = parse_fields(request.args.get('fields'))
+        if CATALOG_SNAPSHOT_READS:
+            return jsonify(list_snapshot_products(
+                fields, category, brand, min_price, max_price, featured, on_sale, limit, offset, cursor
+            ))
+        
+        # Select only the columns the requested fields need, plus the cursor key
+        serializer = product_serializer(fields, ('price', 'id'))
         
         # Build query
-        query = session.query(Product)
+        session = db_manager.get_session()
+        query = session.query(*serializer.columns)
         
         # Apply filters
         if category:
-            query = query.filter(Product.category.ilike(f'%{category}%'))
+            query = query.filter(Product.category.in_(matching_values('category', category)))
         
         if brand:
-            query = query.filter(Product.brand.ilike(f'%{brand}%'))
+            query = query.filter(Product.brand.in_(matching_values('brand', brand)))
         
         if min_price is not None:
             query = query.filter(Product.price >= min_price)
@@ -145,133 +280,229 @@ def get_products():
         if on_sale is not None:
             query = query.filter(Product.is_on_sale == on_sale)
         
-        # Get total count
-        total_count = query.count()
+        # Get total count (capped estimate unless include_total=true)
+        total_count, total_count_exact = count_rows(query, exact=include_total)
+        
+        # Apply pagination: keyset on (price, id) after a cursor, offset otherwise
+        query = query.order_by(Product.price, Product.id)
+        if cursor:
+            position = decode_cursor(cursor, price=(int, float), id=int)
+            query = query.filter(tuple_(Product.price, Product.id) > (position['price'], position['id']))
+        else:
+            query = query.offset(offset)
+        
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        # Apply pagination
-        products = query.offset(offset).limit(limit).all()
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = encode_cursor({'price': serializer.value(last, 'price'), 'id': serializer.value(last, 'id')})
         
         # Convert to dict
-        products_data = [product.to_dict() for product in products]
+        products_data = serializer.to_dicts(rows)
         
         return jsonify({
             'products': products_data,
             'total_count': total_count,
+            'total_count_exact': total_count_exact,
             'limit': limit,
             'offset': offset,
-            'has_more': offset + len(products_data) < total_count
+            'has_more': has_more,
+            'next_cursor': next_cursor
         })
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get products: {str(e)}'}), 500
     finally:
-        db_manager.close_session(session)
+        if session is not None:
+            db_manager.close_session(session)
+
+def list_snapshot_products(fields, category, brand, min_price, max_price, featured, on_sale, limit, offset, cursor):
+    """Build the /api/products response from the catalog snapshot; counts are always exact."""
+    snapshot = product_catalog.snapshot()
+    filters = {
+        'categories': [category] if category else (),
+        'brands': [brand] if brand else (),
+        'min_price': min_price,
+        'max_price': max_price,
+        'featured': featured,
+        'on_sale': on_sale
+    }
+    
+    after = None
+    if cursor:
+        position = decode_cursor(cursor, price=(int, float), id=int)
+        after = (position['price'], position['id'])
+    page, has_more = snapshot.page(limit, offset, after, **filters)
+    
+    # One vectorized pass over the filter columns; no sorting
+    total_count = int(np.count_nonzero(snapshot.matches(**filters)))
+    
+    next_cursor = None
+    if has_more and len(page):
+        last = page[-1]
+        next_cursor = encode_cursor({'price': float(snapshot.price[last]), 'id': int(snapshot.ids[last])})
+    
+    return {
+        'products': [snapshot.product(position, fields) for position in page],
+        'total_count': total_count,
+        'total_count_exact': True,
+        'limit': limit,
+        'offset': offset,
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    }
 
 @app.route('/api/products/search', methods=['GET'])
+@catalog_cached
 def search_products():
     """Search products by keyword."""
     try:
+        session = db_manager.get_session()
+        
         query_text = request.args.get('q', '').strip()
         limit = request.args.get('limit', default=20, type=int)
         
         if not query_text:
             return jsonify({'error': 'Search query is required'}), 400
         
-        session = db_manager.get_session()
-        
-        # Search in name and description
-        from sqlalchemy import or_
-        
-        products = session.query(Product).filter(
-            or_(
-                Product.name.ilike(f'%{query_text}%'),
-                Product.description.ilike(f'%{query_text}%'),
-                Product.brand.ilike(f'%{query_text}%'),
-                Product.category.ilike(f'%{query_text}%')
-            )
-        ).limit(limit).all()
-        
-        products_data = [product.to_dict() for product in products]
+        serializer = product_serializer(parse_fields(request.args.get('fields')), ('id',))
+        
+        # Ranked full-text search, falling back to substring matching without FTS5
+        results = full_text_search(session, query_text, limit, serializer.columns)
+        
+        if results is not None:
+            products_data = []
+            for row, score, snippet in results:
+                product_data = serializer.to_dict(row)
+                product_data['relevance_score'] = score
+                product_data['snippet'] = snippet
+                products_data.append(product_data)
+        else:
+            from sqlalchemy import or_
+            
+            rows = session.query(*serializer.columns).filter(
+                or_(
+                    Product.name.ilike(f'%{query_text}%'),
+                    Product.description.ilike(f'%{query_text}%'),
+                    Product.brand.ilike(f'%{query_text}%'),
+                    Product.category.ilike(f'%{query_text}%')
+                )
+            ).limit(limit).all()
+            
+            products_data = serializer.to_dicts(rows)
         
         return jsonify({
             'products': products_data,
             'query': query_text,
+            'search_mode': 'full_text' if results is not None else 'basic',
             'total_results': len(products_data)
         })
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Search failed: {str(e)}'}), 500
     finally:
         db_manager.close_session(session)
 
 @app.route('/api/products/<int:product_id>', methods=['GET'])
+@catalog_cached
 def get_product(product_id):
     """Get single product by ID."""
+    session = None
     try:
+        fields = parse_fields(request.args.get('fields'))
+        if CATALOG_SNAPSHOT_READS:
+            snapshot = product_catalog.snapshot()
+            positions, found = snapshot.positions([product_id])
+            if not len(positions):
+                return jsonify({'error': 'Product not found'}), 404
+            return jsonify({
+                'product': snapshot.product(positions[0], fields)
+            })
+        
+        serializer = product_serializer(fields)
         session = db_manager.get_session()
+        row = session.query(*serializer.columns).filter(Product.id == product_id).first()
         
-        product = session.query(Product).filter(Product.id == product_id).first()
-        
-        if not product:
+        if not row:
             return jsonify({'error': 'Product not found'}), 404
         
         return jsonify({
-            'product': product.to_dict()
+            'product': serializer.to_dict(row)
         })
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get product: {str(e)}'}), 500
     finally:
-        db_manager.close_session(session)
+        if session is not None:
+            db_manager.close_session(session)
 
 @app.route('/api/products/categories', methods=['GET'])
+@catalog_cached
 def get_categories():
     """Get all available product categories."""
     try:
-        session = db_manager.get_session()
-        
-        # Get distinct categories
-        categories = session.query(Product.category).distinct().all()
-        category_list = [category[0] for category in categories if category[0]]
+        categories = facet_index.categories()
         
         return jsonify({
-            'categories': sorted(category_list)
+            'categories': [category for category, count in categories],
+            'counts': dict(categories)
         })
-        
+    
     except Exception as e:
         return jsonify({'error': f'Failed to get categories: {str(e)}'}), 500
-    finally:
-        db_manager.close_session(session)
 
 @app.route('/api/products/brands', methods=['GET'])
+@catalog_cached
 def get_brands():
     """Get all available product brands."""
     try:
-        session = db_manager.get_session()
-        
-        # Get distinct brands
-        brands = session.query(Product.brand).distinct().all()
-        brand_list = [brand[0] for brand in brands if brand[0]]
+        brands = facet_index.brands()
         
         return jsonify({
-            'brands': sorted(brand_list)
+            'brands': [brand for brand, count in brands],
+            'counts': dict(brands)
         })
-        
+    
     except Exception as e:
         return jsonify({'error': f'Failed to get brands: {str(e)}'}), 500
-    finally:
-        db_manager.close_session(session)
+
+@app.route('/api/products/facets', methods=['GET'])
+@catalog_cached
+def get_product_facets():
+    """Get category, brand, price-range, on-sale and featured counts for a filter set."""
+    try:
+        # Same filters as /api/products
+        facets = facet_index.facets(
+            category=request.args.get('category'),
+            brand=request.args.get('brand'),
+            min_price=request.args.get('min_price', type=float),
+            max_price=request.args.get('max_price', type=float),
+            featured=flag_arg('featured'),
+            on_sale=flag_arg('on_sale')
+        )
+        
+        return jsonify(facets)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to get product facets: {str(e)}'}), 500
 
 # Chatbot endpoints
 @app.route('/api/chat', methods=['POST'])
-@jwt_required()
-def chat():
+@user_required
+def chat(user):
     """Process chat message and return bot response."""
     try:
-        # Debug JWT identity
-        user_id_str = get_jwt_identity()
-        print(f"🔍 Chat endpoint - JWT identity: {user_id_str} (type: {type(user_id_str)})")
-        
         data = request.get_json()
         
         if not data:
@@ -283,16 +514,8 @@ def chat():
         if not message:
             return jsonify({'error': 'Message is required'}), 400
         
-        try:
-            user_id = int(user_id_str)
-        except (ValueError, TypeError):
-            print(f"❌ Invalid user ID format in chat: {user_id_str}")
-            return jsonify({'error': 'Invalid user authentication'}), 401
-        
-        print(f"✅ Chat request from user ID: {user_id}")
-        
         # Process message with chatbot
-        result = chatbot.process_message(user_id, message, session_token)
+        result = chatbot.process_message(user['id'], message, session_token)
         
         return jsonify({
             'response': result['response'],
@@ -300,81 +523,123 @@ def chat():
             'session_id': result.get('session_id'),
             'timestamp': datetime.utcnow().isoformat()
         })
+    
+    except Exception as e:
+        logger.exception("Chat processing failed")
+        return jsonify({'error': f'Chat processing failed: {str(e)}'}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+@user_required
+def chat_stream(user):
+    """Process chat message and stream the bot response as Server-Sent Events."""
+    try:
+        data = request.get_json()
         
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        message = data.get('message', '').strip()
+        session_token = data.get('session_token')
+        
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        user_id = user['id']
+        received_at = datetime.utcnow()
+        exchange = {'session_token': session_token, 'response': None}
+        
+        def generate():
+            for event, payload in chatbot.stream_message(user_id, message, session_token):
+                if event == 'start':
+                    exchange['session_token'] = payload['session_token']
+                elif event == 'done':
+                    exchange['response'] = payload['response']
+                    payload['timestamp'] = datetime.utcnow().isoformat()
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        
+        def persist_exchange():
+            # Runs once the response has been sent, keeping writes off the critical path
+            if not exchange['session_token']:
+                return
+            try:
+                chatbot.save_exchange(user_id, exchange['session_token'], message, exchange['response'], received_at)
+            except Exception as e:
+                logger.exception("Failed to save streamed chat")
+        
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.call_on_close(persist_exchange)
+        return response
+    
     except Exception as e:
-        print(f"❌ Chat processing error: {str(e)}")
+        logger.exception("Chat stream failed")
         return jsonify({'error': f'Chat processing failed: {str(e)}'}), 500
 
+# Largest page of chat sessions one request returns
+MAX_CHAT_SESSIONS_PAGE = 100
+
 @app.route('/api/chat/history', methods=['GET'])
-@jwt_required()
-def get_chat_history():
+@user_required
+def get_chat_history(user):
     """Get chat history for current user."""
     try:
-        user_id_str = get_jwt_identity()
-        print(f"🔍 Chat history endpoint - JWT identity: {user_id_str} (type: {type(user_id_str)})")
-        
-        try:
-            user_id = int(user_id_str)
-        except (ValueError, TypeError):
-            print(f"❌ Invalid user ID format in chat history: {user_id_str}")
-            return jsonify({'error': 'Invalid user authentication'}), 401
-        
         session_token = request.args.get('session_token')
         limit = request.args.get('limit', default=50, type=int)
+        cursor = request.args.get('cursor')
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
         
         # Get chat history
-        messages = chatbot.get_chat_history(user_id, session_token, limit)
+        messages, next_cursor = chatbot.get_chat_history(user['id'], session_token, limit, cursor)
         
         return jsonify({
             'messages': messages,
             'session_token': session_token,
-            'total_messages': len(messages)
+            'total_messages': len(messages),
+            'has_more': next_cursor is not None,
+            'next_cursor': next_cursor
         })
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Chat history error: {str(e)}")
+        logger.exception("Chat history failed")
         return jsonify({'error': f'Failed to get chat history: {str(e)}'}), 500
 
 @app.route('/api/chat/sessions', methods=['GET'])
-@jwt_required()
-def get_chat_sessions():
-    """Get all chat sessions for current user."""
+@user_required
+def get_chat_sessions(user):
+    """Get a page of chat sessions for current user."""
     try:
-        user_id_str = get_jwt_identity()
-        print(f"🔍 Chat sessions endpoint - JWT identity: {user_id_str} (type: {type(user_id_str)})")
-        
-        try:
-            user_id = int(user_id_str)
-        except (ValueError, TypeError):
-            print(f"❌ Invalid user ID format in chat sessions: {user_id_str}")
-            return jsonify({'error': 'Invalid user authentication'}), 401
+        limit = request.args.get('limit', default=50, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        if limit < 1 or offset < 0:
+            raise ValueError('limit must be at least 1 and offset cannot be negative')
+        limit = min(limit, MAX_CHAT_SESSIONS_PAGE)
         
         # Get user sessions
-        sessions = chatbot.get_user_sessions(user_id)
+        sessions, total_sessions = chatbot.get_user_sessions(user['id'], limit, offset)
         
         return jsonify({
             'sessions': sessions,
-            'total_sessions': len(sessions)
+            'total_sessions': total_sessions,
+            'limit': limit,
+            'offset': offset,
+            'has_more': offset + len(sessions) < total_sessions
         })
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Chat sessions error: {str(e)}")
+        logger.exception("Chat sessions failed")
         return jsonify({'error': f'Failed to get chat sessions: {str(e)}'}), 500
 
 @app.route('/api/chat/reset', methods=['POST'])
-@jwt_required()
-def reset_chat():
+@user_required
+def reset_chat(user):
     """Create a new chat session."""
     try:
-        user_id_str = get_jwt_identity()
-        print(f"🔍 Chat reset endpoint - JWT identity: {user_id_str} (type: {type(user_id_str)})")
-        
-        try:
-            user_id = int(user_id_str)
-        except (ValueError, TypeError):
-            print(f"❌ Invalid user ID format in chat reset: {user_id_str}")
-            return jsonify({'error': 'Invalid user authentication'}), 401
-        
         # Generate new session token
         session_token = chatbot._create_session_token()
         
@@ -382,9 +647,9 @@ def reset_chat():
             'session_token': session_token,
             'message': 'New chat session created'
         })
-        
+    
     except Exception as e:
-        print(f"❌ Chat reset error: {str(e)}")
+        logger.exception("Chat reset failed")
         return jsonify({'error': f'Failed to reset chat: {str(e)}'}), 500
 
 # Error handlers
@@ -2,17 +2,32 @@
 Authentication utilities for JWT token handling and user management.
 """
 
+from flask import g, jsonify
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from datetime import timedelta
+from functools import wraps
+import logging
 import secrets
 from models import User, db_manager
+from cache import QueryCache
+from hashing import HashingBusy
 import os
 
+logger = logging.getLogger(__name__)
+
 class AuthManager:
     """Handles authentication and user management."""
     
     def __init__(self, app=None):
         self.jwt = None
+        
+        # User records keyed on id, dropped when the user row changes
+        self.user_cache = QueryCache(
+            max_entries=int(os.environ.get('AUTH_USER_CACHE_SIZE', 4096)),
+            ttl_seconds=float(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+        )
+        db_manager.add_user_listener(self._on_user_changes)
+        
         if app:
             self.init_app(app)
     
@@ -23,7 +38,7 @@ class AuthManager:
         app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'dev-jwt-secret-key-for-ecommerce-chatbot-2024')
         app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
         self.jwt = JWTManager(app)
-        
+    
     def register_user(self, username, email, password):
         """Register a new user."""
         session = db_manager.get_session()
@@ -50,19 +65,21 @@ class AuthManager:
             session.refresh(user)
             
             # Create access token with string identity
-            print(f"🔧 Creating JWT token for user ID: {user.id} (type: {type(user.id)})")
             access_token = create_access_token(identity=str(user.id))
-            print(f"✅ JWT token created successfully")
+            logger.debug("Registered user %s", user.id, extra={'user_id': user.id})
             
             return {
                 'message': 'User registered successfully',
                 'access_token': access_token,
                 'user': user.to_dict()
             }, 201
-            
+        
+        except HashingBusy:
+            session.rollback()
+            return {'error': 'Too many authentication requests, please try again shortly'}, 429
         except Exception as e:
             session.rollback()
-            print(f"❌ Registration error: {str(e)}")
+            logger.exception("Registration failed")
             return {'error': f'Registration failed: {str(e)}'}, 500
         finally:
             db_manager.close_session(session)
@@ -82,45 +99,82 @@ class AuthManager:
             if not user.is_active:
                 return {'error': 'Account is disabled'}, 401
             
+            # Upgrade hashes made with a previous cost factor while the password is at hand
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    session.commit()
+                except HashingBusy:
+                    pass  # Retry on a later login rather than failing this one
+            
             # Create access token with string identity
-            print(f"🔧 Creating JWT token for user ID: {user.id} (type: {type(user.id)})")
             access_token = create_access_token(identity=str(user.id))
-            print(f"✅ JWT token created successfully")
+            logger.debug("Logged in user %s", user.id, extra={'user_id': user.id})
             
             return {
                 'message': 'Login successful',
                 'access_token': access_token,
                 'user': user.to_dict()
             }, 200
-            
+        
+        except HashingBusy:
+            return {'error': 'Too many authentication requests, please try again shortly'}, 429
         except Exception as e:
-            print(f"❌ Login error: {str(e)}")
+            session.rollback()
+            logger.exception("Login failed")
             return {'error': f'Login failed: {str(e)}'}, 500
         finally:
             db_manager.close_session(session)
     
     def get_current_user(self):
-        """Get current authenticated user."""
-        user_id_str = get_jwt_identity()
-        print(f"🔍 JWT identity retrieved: {user_id_str} (type: {type(user_id_str)})")
+        """Get current authenticated user, resolved once per request."""
+        if 'current_user' in g:
+            return g.current_user
         
+        user_id_str = get_jwt_identity()
         try:
             user_id = int(user_id_str)
         except (ValueError, TypeError):
-            print(f"❌ Invalid user ID format: {user_id_str}")
+            logger.warning("Invalid user id in token: %r", user_id_str)
+            g.current_user = None
             return None
-            
+        
+        g.current_user = self.get_user(user_id)
+        return g.current_user
+    
+    def get_user(self, user_id):
+        """Get a user as a dictionary, from the user cache when possible."""
+        user = self.user_cache.get(user_id)
+        if user is not None:
+            return user
+        
+        generation = self.user_cache.generation
         session = db_manager.get_session()
         try:
             user = session.query(User).filter(User.id == user_id).first()
-            if user:
-                print(f"✅ User found: {user.username}")
-            else:
-                print(f"❌ User not found with ID: {user_id}")
-            return user.to_dict() if user else None
+            if not user:
+                logger.debug("User %s not found", user_id, extra={'user_id': user_id})
+                return None
+            
+            user = user.to_dict()
+            self.user_cache.set(user_id, user, generation)
+            return user
         finally:
             db_manager.close_session(session)
     
+    def invalidate_user(self, user_id):
+        """Drop a cached user, e.g. after changing the users table outside the ORM."""
+        self.user_cache.delete(user_id)
+    
+    def get_cache_stats(self):
+        """Get user cache counters."""
+        return self.user_cache.stats()
+    
+    def _on_user_changes(self, user_ids):
+        """Drop cached records for users updated or deleted by a commit."""
+        for user_id in user_ids:
+            self.invalidate_user(user_id)
+    
     def validate_user_data(self, username, email, password):
         """Validate user registration data."""
         errors = []
@@ -146,4 +200,17 @@ class AuthManager:
         return errors
 
 # Global auth manager instance
-auth_manager = AuthManager() 
\ No newline at end of file
+auth_manager = AuthManager()
+
+def user_required(view):
+    """Require a valid JWT for an active user and pass the user dictionary to the view."""
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = auth_manager.get_current_user()
+        if not user:
+            return jsonify({'error': 'Invalid user authentication'}), 401
+        if not user['is_active']:
+            return jsonify({'error': 'Account is disabled'}), 401
+        return view(user, *args, **kwargs)
+    return wrapper 
\ No newline at end of file
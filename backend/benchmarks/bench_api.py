@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: API latency and throughput on synthetic catalogs, with baseline comparison.
+
+For each catalog size a child process seeds a scratch database with that
+many products plus chat histories, then drives the endpoints through the
+Flask test client and times ChatbotEngine._extract_search_criteria and
+_generate_response in isolation, the latter both cold (search cache cleared
+before every call) and warm (every message already cached). Each
+measurement reports throughput and p50/p95/p99 latency. Results are
+written as JSON; with --baseline, p95 latencies more than --tolerance (and
+--min-delta-ms) slower than the baseline fail the run.
+
+Usage: python benchmarks/bench_api.py [--sizes 1000,100000,1000000] [--requests 200] [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+"""
+
+import argparse
+import io
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chat messages cycled through by /api/chat and the chatbot microbenchmarks
+CHAT_MESSAGES = [
+    'Show me laptops under $1500',
+    'I need wireless headphones',
+    'apple phones under 1000',
+    'cheap samsung tablets',
+    'Show me smartwatches',
+    'Hello',
+    'What can you help me with?',
+    'Find Sony headphones between $100 and $400',
+    'gaming laptop with good rating',
+    'Dell accessories'
+]
+
+# Search terms cycled through by /api/products/search
+SEARCH_TERMS = ['laptop', 'wireless', 'apple', 'galaxy', 'noise cancelling', 'watch', 'pro', 'usb']
+
+# Query strings cycled through by /api/products
+PRODUCT_QUERIES = [
+    '', '?category=laptops', '?brand=apple&max_price=1000', '?min_price=100&max_price=500',
+    '?on_sale=true', '?featured=true&limit=20', '?category=headphones&fields=id,name,display_price'
+]
+
+CATEGORIES = ['laptops', 'smartphones', 'headphones', 'tablets', 'smartwatches', 'accessories']
+BRANDS = ['Apple', 'Samsung', 'Sony', 'Dell', 'Google', 'Bose', 'Lenovo', 'Anker', 'HP', 'ASUS']
+ADJECTIVES = ['Pro', 'Max', 'Ultra', 'Lite', 'Air', 'Plus', 'Mini', 'Wireless', 'Gaming', 'Slim']
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def summarize(latencies, elapsed, errors=0):
+    """Summarize per-call seconds into throughput and millisecond percentiles."""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3) if ordered else None,
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3) if ordered else None,
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3) if ordered else None
+    }
+
+def measure(call, count, warmup, prepare=None):
+    """Time count calls of call(i) after warmup untimed ones; call returns False on an error.
+    
+    prepare(i), when given, runs untimed before every call, e.g. to clear a cache.
+    """
+    for i in range(warmup):
+        if prepare is not None:
+            prepare(i)
+        call(i)
+    
+    latencies = []
+    errors = 0
+    elapsed = 0.0
+    for i in range(count):
+        if prepare is not None:
+            prepare(i)
+        call_start = time.perf_counter()
+        if call(i) is False:
+            errors += 1
+        latencies.append(time.perf_counter() - call_start)
+        elapsed += latencies[-1]
+    return summarize(latencies, elapsed, errors)
+
+def seed_database(products, sessions, messages_per_session, seed_value=42):
+    """Insert generated products, a benchmark user and chat histories with Core executemany."""
+    from sqlalchemy import insert
+    from models import db_manager, Product, User, ChatSession, ChatMessage
+    
+    rng = random.Random(seed_value)
+    session = db_manager.get_session()
+    try:
+        batch = []
+        for i in range(products):
+            brand = rng.choice(BRANDS)
+            category = rng.choice(CATEGORIES)
+            price = round(rng.uniform(10, 3000), 2)
+            on_sale = rng.random() < 0.2
+            batch.append({
+                'name': f'{brand} {category[:-1].title()} {rng.choice(ADJECTIVES)} {i}',
+                'description': f'{rng.choice(ADJECTIVES)} {brand} {category[:-1]} with {rng.choice(ADJECTIVES).lower()} design.',
+                'price': price,
+                'category': category,
+                'brand': brand,
+                'stock_quantity': rng.randint(0, 500),
+                'image_url': f'https://example.com/images/{i}.jpg',
+                'rating': round(rng.uniform(1, 5), 1),
+                'is_featured': rng.random() < 0.05,
+                'is_on_sale': on_sale,
+                'sale_price': round(price * 0.8, 2) if on_sale else None
+            })
+            if len(batch) == 10000:
+                session.execute(insert(Product), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Product), batch)
+        
+        user = User(username='benchmark', email='benchmark@example.com')
+        user.set_password('benchmark-password')
+        session.add(user)
+        session.flush()
+        user_id = user.id
+        
+        started = datetime.utcnow() - timedelta(days=30)
+        tokens = []
+        for i in range(sessions):
+            token = f'bench-session-{i}'
+            tokens.append(token)
+            session.add(ChatSession(
+                user_id=user_id, session_token=token,
+                created_at=started + timedelta(hours=i), updated_at=started + timedelta(hours=i, minutes=messages_per_session)
+            ))
+        session.flush()
+        
+        session_ids = [row[0] for row in session.query(ChatSession.id).filter(ChatSession.user_id == user_id)]
+        messages = []
+        for session_id in session_ids:
+            for j in range(messages_per_session):
+                messages.append({
+                    'session_id': session_id,
+                    'message_type': 'user' if j % 2 == 0 else 'bot',
+                    'content': rng.choice(CHAT_MESSAGES),
+                    'timestamp': started + timedelta(minutes=session_id * 60 + j)
+                })
+        for start in range(0, len(messages), 10000):
+            session.execute(insert(ChatMessage), messages[start:start + 10000])
+        
+        session.commit()
+        return user_id, tokens
+    finally:
+        db_manager.close_session(session)
+
+def run_size(args):
+    """Seed one catalog size in this (child) process and return its measurements."""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_api.db')}"
+    os.environ.setdefault('BCRYPT_ROUNDS', '4')
+    os.environ.setdefault('CATALOG_CHANGE_POLL_MS', '0')
+    sys.path.insert(0, BACKEND_DIR)
+    
+    # Keep the app's console output out of the JSON written to stdout
+    with redirect_stdout(io.StringIO()):
+        seed_start = time.perf_counter()
+        user_id, tokens = seed_database(args.size, args.sessions, args.messages)
+        seed_seconds = time.perf_counter() - seed_start
+        
+        startup_start = time.perf_counter()
+        from app import app
+        from chatbot import chatbot
+        from models import db_manager
+        from flask_jwt_extended import create_access_token
+        startup_seconds = time.perf_counter() - startup_start
+        
+        with app.app_context():
+            headers = {'Authorization': f"Bearer {create_access_token(identity=str(user_id))}"}
+        client = app.test_client()
+        
+        def get(path):
+            return lambda i: client.get(path(i), headers=headers).status_code == 200
+        
+        def chat(i):
+            response = client.post('/api/chat', headers=headers, json={
+                'message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+                'session_token': tokens[i % len(tokens)] if tokens else None
+            })
+            return response.status_code == 200
+        
+        endpoints = {
+            'POST /api/chat': chat,
+            'GET /api/products': get(lambda i: '/api/products' + PRODUCT_QUERIES[i % len(PRODUCT_QUERIES)]),
+            'GET /api/products/search': get(lambda i: f'/api/products/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}'),
+            'GET /api/chat/history': get(
+                lambda i: f'/api/chat/history?session_token={tokens[i % len(tokens)]}' if tokens else '/api/chat/history'
+            ),
+            'GET /api/chat/sessions': get(lambda i: '/api/chat/sessions')
+        }
+        results = {name: measure(call, args.requests, args.warmup) for name, call in endpoints.items()}
+        
+        def extract(i):
+            chatbot._extract_search_criteria(CHAT_MESSAGES[i % len(CHAT_MESSAGES)].lower())
+        
+        def generate(i):
+            session = db_manager.get_session()
+            try:
+                chatbot._generate_response(session, CHAT_MESSAGES[i % len(CHAT_MESSAGES)])
+            finally:
+                db_manager.close_session(session)
+        
+        results['ChatbotEngine._extract_search_criteria'] = measure(extract, args.requests * 10, args.warmup)
+        # Cycled messages repeat every few calls, so without clearing the search cache nearly every call is a hit
+        results['ChatbotEngine._generate_response (cold)'] = measure(
+            generate, args.requests, args.warmup, prepare=lambda i: chatbot.search_cache.clear()
+        )
+        results['ChatbotEngine._generate_response (warm)'] = measure(
+            generate, args.requests, max(args.warmup, len(CHAT_MESSAGES))
+        )
+    
+    return {
+        'products': args.size,
+        'chat_sessions': args.sessions,
+        'messages_per_session': args.messages,
+        'seed_seconds': round(seed_seconds, 2),
+        'startup_seconds': round(startup_seconds, 2),
+        'results': results
+    }
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Get regressions: measurements whose p95 grew by more than tolerance and min_delta_ms over the baseline."""
+    regressions = []
+    for size, run in current['sizes'].items():
+        baseline_run = baseline.get('sizes', {}).get(size)
+        if not baseline_run:
+            continue
+        for name, result in run['results'].items():
+            before = baseline_run['results'].get(name, {}).get('p95_ms')
+            after = result.get('p95_ms')
+            if before and after and after > before * (1 + tolerance) and after - before > min_delta_ms:
+                regressions.append({'size': size, 'name': name, 'baseline_p95_ms': before, 'p95_ms': after,
+                                    'change': round(after / before - 1, 3)})
+    return regressions
+
+def print_table(report):
+    """Print a human-readable summary to stderr, keeping stdout for --output -."""
+    for size, run in report['sizes'].items():
+        print(f"\n{size} products (seeded in {run['seed_seconds']} s, app startup {run['startup_seconds']} s)", file=sys.stderr)
+        print(f"  {'measurement':<42} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}", file=sys.stderr)
+        for name, result in run['results'].items():
+            print(f"  {name:<42} {result['throughput_rps']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                  f"{result['p99_ms']:>9} {result['errors']:>7}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma-separated catalog sizes')
+    parser.add_argument('--requests', type=int, default=200, help='Timed calls per measurement')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed calls before each measurement')
+    parser.add_argument('--sessions', type=int, default=20, help='Chat sessions seeded for the benchmark user')
+    parser.add_argument('--messages', type=int, default=50, help='Messages seeded per chat session')
+    parser.add_argument('--output', default='-', help="JSON results file, '-' for stdout")
+    parser.add_argument('--baseline', help='Earlier JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown over the baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore p95 slowdowns smaller than this')
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    # Child mode: one catalog size, JSON on stdout
+    if args.size is not None:
+        json.dump(run_size(args), sys.stdout)
+        return
+    
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'requests': args.requests,
+        'sizes': {}
+    }
+    for size in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        print(f"⏱️ Benchmarking {size} products...", file=sys.stderr)
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--size', str(size), '--requests', str(args.requests),
+             '--warmup', str(args.warmup), '--sessions', str(args.sessions), '--messages', str(args.messages)],
+            stdout=subprocess.PIPE, check=True, text=True
+        )
+        report['sizes'][str(size)] = json.loads(child.stdout)
+    
+    print_table(report)
+    
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report['regressions'] = compare(report, json.load(baseline_file), args.tolerance, args.min_delta_ms)
+        for regression in report['regressions']:
+            print(f"❌ {regression['size']} products, {regression['name']}: p95 {regression['baseline_p95_ms']} ms -> "
+                  f"{regression['p95_ms']} ms ({regression['change']:+.0%})", file=sys.stderr)
+        if report['regressions']:
+            exit_code = 1
+        else:
+            print(f"✅ No p95 regressions beyond {args.tolerance:.0%} of the baseline", file=sys.stderr)
+    
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    sys.exit(exit_code)
+
+if __name__ == '__main__':
+    main()
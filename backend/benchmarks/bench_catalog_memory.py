@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by the catalog as ORM Product entities vs the columnar CatalogSnapshot.
+
+Builds a scratch database of --products products, then measures with
+tracemalloc the memory retained by each representation once loaded, and
+reports it per 100k products along with load time (inflated by tracing).
+
+Usage: python benchmarks/bench_catalog_memory.py [--products 100000]
+"""
+
+import argparse
+import gc
+import random
+import sys
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Use a scratch database
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_catalog_memory.db')}"
+
+from datetime import datetime
+from sqlalchemy import insert
+from models import db_manager, Product
+from catalog import CatalogSnapshot, SNAPSHOT_COLUMNS
+
+def seed(count, seed_value=42):
+    """Insert count generated products in one executemany."""
+    rng = random.Random(seed_value)
+    categories = ['laptops', 'smartphones', 'headphones', 'tablets', 'smartwatches', 'accessories']
+    brands = ['Apple', 'Samsung', 'Sony', 'Dell', 'Google', 'Bose', 'Lenovo', 'Anker']
+    rows = []
+    for i in range(count):
+        price = round(rng.uniform(10, 3000), 2)
+        on_sale = rng.random() < 0.2
+        brand = rng.choice(brands)
+        rows.append({
+            'name': f'{brand} Product {i}',
+            'description': f'{brand} {rng.choice(categories)} with a generated description for memory benchmarking.',
+            'price': price,
+            'category': rng.choice(categories),
+            'brand': brand,
+            'stock_quantity': rng.randint(0, 500),
+            'image_url': f'https://example.com/images/{i}.jpg',
+            'rating': round(rng.uniform(1, 5), 1),
+            'is_featured': rng.random() < 0.1,
+            'is_on_sale': on_sale,
+            'sale_price': round(price * 0.8, 2) if on_sale else None,
+            'created_at': datetime.utcnow()
+        })
+    
+    session = db_manager.get_session()
+    try:
+        session.execute(insert(Product), rows)
+        session.commit()
+    finally:
+        db_manager.close_session(session)
+
+def measure(load):
+    """Run load() under tracemalloc; return (seconds, bytes still held by its result, peak bytes, result)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, peak, result
+
+def load_orm():
+    """Full Product entities held by an open session, as list endpoints used to load them."""
+    session = db_manager.get_session()
+    return session, session.query(Product).all()
+
+def load_snapshot():
+    """Selected column tuples packed into a CatalogSnapshot; the rows are dropped afterwards."""
+    session = db_manager.get_session()
+    try:
+        rows = session.query(*SNAPSHOT_COLUMNS).all()
+    finally:
+        db_manager.close_session(session)
+    return CatalogSnapshot.from_rows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    args = parser.parse_args()
+    
+    seed(args.products)
+    scale = 100000 / args.products
+    
+    print(f"Products loaded: {args.products} (memory scaled to 100k products)")
+    print(f"{'representation':<28} {'load':>9} {'retained':>12} {'peak':>12}")
+    
+    orm_seconds, orm_bytes, orm_peak, (session, products) = measure(load_orm)
+    print(f"{'ORM Product entities':<28} {orm_seconds * 1000:7.0f} ms {orm_bytes * scale / 2**20:9.1f} MiB {orm_peak * scale / 2**20:9.1f} MiB")
+    del products
+    db_manager.close_session(session)
+    
+    snapshot_seconds, snapshot_bytes, snapshot_peak, snapshot = measure(load_snapshot)
+    print(f"{'CatalogSnapshot':<28} {snapshot_seconds * 1000:7.0f} ms {snapshot_bytes * scale / 2**20:9.1f} MiB {snapshot_peak * scale / 2**20:9.1f} MiB")
+    print(f"Snapshot column buffers: {snapshot.nbytes * scale / 2**20:.1f} MiB; retained memory {orm_bytes / max(snapshot_bytes, 1):.1f}x smaller than ORM")
+
+if __name__ == '__main__':
+    main()
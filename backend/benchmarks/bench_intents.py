@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: precompiled IntentClassifier vs the original per-message re.search classifier.
+
+Usage: python benchmarks/bench_intents.py [--messages 100000] [--seed 42]
+"""
+
+import argparse
+import random
+import re
+import sys
+import os
+import time
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import IntentClassifier, DEFAULT_CATEGORY_KEYWORDS, DEFAULT_BRAND_KEYWORDS
+
+# Patterns exactly as ChatbotEngine used them before the precompiled classifier
+LEGACY_GREETING_PATTERNS = [
+    r'\b(hi|hello|hey|good morning|good afternoon|good evening)\b',
+    r'\b(howdy|greetings|what\'s up|whats up)\b'
+]
+
+LEGACY_SEARCH_PATTERNS = [
+    r'\b(show|find|search|look for|get|need|want)\b.*\b(product|item|thing)\b',
+    r'\b(i need|i want|looking for|searching for)\b',
+    r'\b(show me|find me|get me)\b'
+]
+
+def legacy_classify(message):
+    """Classify a message the way ChatbotEngine._generate_response used to."""
+    message = message.lower()
+    
+    for pattern in LEGACY_GREETING_PATTERNS:
+        if re.search(pattern, message, re.IGNORECASE):
+            return 'greeting'
+    
+    for pattern in LEGACY_SEARCH_PATTERNS:
+        if re.search(pattern, message, re.IGNORECASE):
+            return 'product_search'
+    for category, keywords in DEFAULT_CATEGORY_KEYWORDS.items():
+        if any(keyword in message for keyword in keywords):
+            return 'product_search'
+    
+    if any(word in message for word in ['help', 'what can you do', 'how does this work']):
+        return 'help'
+    
+    return 'default'
+
+def build_corpus(size, seed):
+    """Generate a deterministic corpus of chat-like messages."""
+    rng = random.Random(seed)
+    keywords = [keyword for group in DEFAULT_CATEGORY_KEYWORDS.values() for keyword in group]
+    templates = [
+        'Hello there!',
+        'hey, {greeting_tail}',
+        'Show me {brand} {keyword} under ${price}',
+        'I need a {keyword} for work',
+        'find me the cheapest {keyword}',
+        'Do you have any {brand} products between ${price} and ${price2}?',
+        'What can you do?',
+        'help',
+        'Can I get a good thing for my dad',
+        'looking for something {adjective}',
+        'What is the return policy for {adjective} items',
+        'thanks, that was {adjective}',
+        'Is the {brand} {keyword} {adjective}? My old one broke and I want a replacement before the trip next week',
+    ]
+    adjectives = ['cheap', 'great', 'premium', 'durable', 'lightweight', 'fast', 'quiet']
+    greeting_tails = ['how are you', "what's new", 'anything on sale today']
+    
+    corpus = []
+    for _ in range(size):
+        price = rng.randint(20, 2000)
+        corpus.append(rng.choice(templates).format(
+            brand=rng.choice(DEFAULT_BRAND_KEYWORDS).title(),
+            keyword=rng.choice(keywords),
+            price=price,
+            price2=price + rng.randint(50, 500),
+            adjective=rng.choice(adjectives),
+            greeting_tail=rng.choice(greeting_tails)
+        ))
+    return corpus
+
+def time_classifier(classify, corpus):
+    """Run a classifier over the corpus and return (seconds, labels)."""
+    start = time.perf_counter()
+    labels = [classify(message) for message in corpus]
+    return time.perf_counter() - start, labels
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    corpus = build_corpus(args.messages, args.seed)
+    classifier = IntentClassifier()
+    
+    legacy_seconds, legacy_labels = time_classifier(legacy_classify, corpus)
+    new_seconds, new_labels = time_classifier(lambda m: classifier.classify(m)['intent'], corpus)
+    
+    disagreements = sum(1 for old, new in zip(legacy_labels, new_labels) if old != new)
+    
+    print(f"Messages classified: {len(corpus)}")
+    print(f"Legacy re.search classifier:  {legacy_seconds:.3f}s ({len(corpus) / legacy_seconds:,.0f} msg/s)")
+    print(f"Precompiled IntentClassifier: {new_seconds:.3f}s ({len(corpus) / new_seconds:,.0f} msg/s)")
+    print(f"Speedup: {legacy_seconds / new_seconds:.2f}x")
+    print(f"Primary intent disagreements: {disagreements}")
+
+if __name__ == '__main__':
+    main()
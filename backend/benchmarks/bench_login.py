@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: password check throughput through PasswordHasher for different worker counts.
+
+Each run fires --logins concurrent login checks from --clients request threads,
+as a login burst after a deploy would, and reports logins/s and 429 rejections.
+
+Usage: python benchmarks/bench_login.py [--workers 1,2,4,8] [--clients 32] [--logins 256] [--rounds 10] [--max-pending 32]
+"""
+
+import argparse
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hashing import PasswordHasher, HashingBusy
+
+def run_burst(hasher, hashed, clients, logins):
+    """Check one password logins times from clients threads; return (seconds, accepted, rejected)."""
+    def login(_):
+        try:
+            return hasher.check('correct horse battery staple', hashed)
+        except HashingBusy:
+            return None
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as request_threads:
+        results = list(request_threads.map(login, range(logins)))
+    seconds = time.perf_counter() - start
+    
+    rejected = sum(1 for result in results if result is None)
+    assert all(result for result in results if result is not None), 'password check failed'
+    return seconds, logins - rejected, rejected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated worker counts')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--logins', type=int, default=256)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--max-pending', type=int, default=32)
+    args = parser.parse_args()
+    
+    print(f"CPUs: {os.cpu_count()}, bcrypt rounds: {args.rounds}, clients: {args.clients}, logins: {args.logins}")
+    print(f"{'workers':>8} {'seconds':>9} {'logins/s':>10} {'accepted':>9} {'rejected':>9}")
+    
+    for workers in [int(value) for value in args.workers.split(',')]:
+        hasher = PasswordHasher(workers=workers, max_pending=args.max_pending, rounds=args.rounds)
+        hashed = hasher.hash('correct horse battery staple')
+        seconds, accepted, rejected = run_burst(hasher, hashed, args.clients, args.logins)
+        print(f"{workers:>8} {seconds:>9.3f} {accepted / seconds:>10.1f} {accepted:>9} {rejected:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serializing a product list via Product.to_dict + stdlib jsonify vs column tuples + FastJSONProvider.
+
+Builds a scratch database of --products products and times query + dict
+building + JSON encoding for each path, keeping the best of --repeat runs.
+
+Usage: python benchmarks/bench_serialization.py [--products 10000] [--repeat 5] [--fields id,name,display_price]
+"""
+
+import argparse
+import random
+import sys
+import os
+import tempfile
+import time
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Use a scratch database
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}"
+
+from flask import Flask, jsonify
+from models import db_manager, Product
+from serialization import FastJSONProvider, orjson, parse_fields, product_serializer
+
+def seed(count, seed_value=42):
+    """Insert count generated products."""
+    rng = random.Random(seed_value)
+    categories = ['laptops', 'smartphones', 'headphones', 'tablets', 'smartwatches', 'accessories']
+    brands = ['Apple', 'Samsung', 'Sony', 'Dell', 'Google', 'Bose', 'Lenovo', 'Anker']
+    session = db_manager.get_session()
+    try:
+        for i in range(count):
+            price = round(rng.uniform(10, 3000), 2)
+            on_sale = rng.random() < 0.2
+            session.add(Product(
+                name=f'{rng.choice(brands)} Product {i}',
+                description='Generated product used to benchmark list serialization. ' * 2,
+                price=price,
+                category=rng.choice(categories),
+                brand=rng.choice(brands),
+                stock_quantity=rng.randint(0, 500),
+                image_url=f'https://example.com/images/{i}.jpg',
+                rating=round(rng.uniform(1, 5), 1),
+                is_featured=rng.random() < 0.1,
+                is_on_sale=on_sale,
+                sale_price=round(price * 0.8, 2) if on_sale else None
+            ))
+        session.commit()
+    finally:
+        db_manager.close_session(session)
+
+def orm_path(app):
+    """Full Product entities, to_dict() and jsonify, as list endpoints used to do."""
+    session = db_manager.get_session()
+    try:
+        with app.app_context():
+            products = session.query(Product).order_by(Product.price, Product.id).all()
+            return jsonify({'products': [product.to_dict() for product in products]}).get_data()
+    finally:
+        db_manager.close_session(session)
+
+def tuple_path(app, fields):
+    """Selected columns as tuples through ProductSerializer, encoded by the app's JSON provider."""
+    serializer = product_serializer(fields, ('price', 'id'))
+    session = db_manager.get_session()
+    try:
+        with app.app_context():
+            rows = session.query(*serializer.columns).order_by(Product.price, Product.id).all()
+            return jsonify({'products': serializer.to_dicts(rows)}).get_data()
+    finally:
+        db_manager.close_session(session)
+
+def best_time(function, repeat):
+    """Run function repeat times; return (best seconds, last result)."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fields', default='id,name,display_price')
+    args = parser.parse_args()
+    
+    seed(args.products)
+    
+    stdlib_app = Flask('stdlib_json')
+    fast_app = Flask('fast_json')
+    fast_app.json = FastJSONProvider(fast_app)
+    
+    paths = [
+        ('to_dict + stdlib jsonify', lambda: orm_path(stdlib_app)),
+        ('column tuples + stdlib jsonify', lambda: tuple_path(stdlib_app, parse_fields(None))),
+        (f"column tuples + {'orjson' if orjson else 'stdlib (orjson not installed)'}", lambda: tuple_path(fast_app, parse_fields(None))),
+        (f'sparse ?fields={args.fields}', lambda: tuple_path(fast_app, parse_fields(args.fields))),
+    ]
+    
+    print(f"Products serialized: {args.products} (best of {args.repeat})")
+    baseline = None
+    for label, function in paths:
+        seconds, payload = best_time(function, args.repeat)
+        baseline = baseline or seconds
+        print(f"{label:<45} {seconds * 1000:8.1f} ms  {len(payload) / 1024:8.0f} KiB  {baseline / seconds:5.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,523 @@
+"""
+Catalog version tracking for HTTP caching and a columnar product snapshot for ranking.
+"""
+
+import threading
+import numpy as np
+from models import Product, ProductChange, db_manager
+from serialization import PRODUCT_FIELDS
+
+class CatalogVersion:
+    """Catalog version shared by every process: the newest product_changes sequence number.
+    
+    Each product write is logged to product_changes in its own transaction,
+    so workers that have applied the same changes issue the same ETag, and
+    one issued before a restart or an offline change (init_db, bulk loads)
+    never validates afterwards. The log is read when bumped, not per request;
+    a local commit can move the version ahead of changes other processes
+    made that this one has yet to replay, by at most one change feed poll.
+    """
+    
+    def __init__(self):
+        self.version = None
+        self.modified_at = None
+        self._lock = threading.Lock()
+    
+    def bump(self, upserted=None, deleted_ids=None):
+        """Re-read the version from the change log; usable directly as a product listener."""
+        # Read under the lock so concurrent bumps cannot store an older sequence last
+        with self._lock:
+            session = db_manager.get_session()
+            try:
+                latest = session.query(ProductChange.seq, ProductChange.changed_at).order_by(
+                    ProductChange.seq.desc()
+                ).first()
+            finally:
+                db_manager.close_session(session)
+            self.version, self.modified_at = latest if latest is not None else (0, None)
+    
+    def snapshot(self):
+        """Get the strong entity tag for the current version and when it was set."""
+        if self.version is None:
+            self.bump()
+        with self._lock:
+            return f'catalog-{self.version}', self.modified_at
+
+# Global catalog version; app registers its bump as the last product listener
+catalog_version = CatalogVersion()
+
+# Product columns in row order (Product.to_dict order, less the derived display_price)
+SNAPSHOT_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.price, Product.category, Product.brand,
+    Product.stock_quantity, Product.image_url, Product.rating, Product.is_featured, Product.is_on_sale,
+    Product.sale_price, Product.created_at
+)
+
+# Nullable numeric fields; nulls are stored as zero and flagged in CatalogSnapshot.missing
+NULLABLE_FIELDS = ('stock_quantity', 'rating', 'is_featured', 'is_on_sale', 'sale_price')
+
+class StringColumn:
+    """Immutable column of optional strings packed into one UTF-8 buffer with row offsets.
+    
+    Costs the encoded text plus 9 bytes a row, instead of a Python str
+    object (about 50 bytes of overhead each) per value.
+    """
+    
+    def __init__(self, data, offsets, missing):
+        self.data = data
+        self.offsets = offsets
+        self.missing = missing
+    
+    @classmethod
+    def from_values(cls, values):
+        """Pack a sequence of strings or None."""
+        encoded = [(value or '').encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        missing = np.fromiter((value is None for value in values), dtype=bool, count=len(encoded))
+        return cls(b''.join(encoded), offsets, missing)
+    
+    def __len__(self):
+        return len(self.missing)
+    
+    def get(self, position):
+        """Get the string at a row position, or None."""
+        if self.missing[position]:
+            return None
+        return self.data[self.offsets[position]:self.offsets[position + 1]].decode('utf-8')
+    
+    def take(self, positions):
+        """Get a new column with the rows at positions, in that order."""
+        positions = np.asarray(positions, dtype=np.int64)
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        if not len(positions):
+            return StringColumn(b'', offsets, self.missing[positions])
+        np.cumsum(self.offsets[positions + 1] - self.offsets[positions], out=offsets[1:])
+        
+        # Copy runs of consecutive rows in one slice each; after a few changes most rows are in order
+        breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+        run_starts = positions[np.concatenate([[0], breaks])]
+        run_ends = positions[np.concatenate([breaks - 1, [len(positions) - 1]])] + 1
+        buffer = memoryview(self.data)
+        data = b''.join([
+            buffer[start:end] for start, end in zip(self.offsets[run_starts].tolist(), self.offsets[run_ends].tolist())
+        ])
+        return StringColumn(data, offsets, self.missing[positions])
+    
+    def segment(self, position):
+        """Get the encoded bytes at a row position."""
+        return self.data[self.offsets[position]:self.offsets[position + 1]]
+    
+    def replace(self, positions, other, other_positions):
+        """Get a column with the rows at positions set to other's rows at other_positions.
+        
+        Returns this column itself when every value is unchanged, as for a
+        price update, so only text that changed costs a copy of the buffer.
+        """
+        values = [other.segment(position) for position in other_positions]
+        missing = other.missing[other_positions]
+        if np.array_equal(self.missing[positions], missing) and all(
+            self.segment(position) == value for position, value in zip(positions, values)
+        ):
+            return self
+        
+        lengths = np.diff(self.offsets)
+        lengths[positions] = [len(value) for value in values]
+        pieces, previous = [], 0
+        buffer = memoryview(self.data)
+        for index in np.argsort(positions, kind='stable'):
+            position = positions[index]
+            pieces.append(buffer[self.offsets[previous]:self.offsets[position]])
+            pieces.append(values[index])
+            previous = position + 1
+        pieces.append(buffer[self.offsets[previous]:])
+        
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        changed = self.missing.copy()
+        changed[positions] = missing
+        return StringColumn(b''.join(pieces), offsets, changed)
+    
+    def insert(self, positions, other):
+        """Get a column with other's rows inserted before the (ascending) positions, like np.insert."""
+        values = [other.segment(position) for position in range(len(other))]
+        pieces, previous = [], 0
+        buffer = memoryview(self.data)
+        for position, value in zip(positions, values):
+            pieces.append(buffer[self.offsets[previous]:self.offsets[position]])
+            pieces.append(value)
+            previous = position
+        pieces.append(buffer[self.offsets[previous]:])
+        
+        lengths = np.insert(np.diff(self.offsets), positions, [len(value) for value in values])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return StringColumn(b''.join(pieces), offsets, np.insert(self.missing, positions, other.missing))
+    
+    @property
+    def nbytes(self):
+        """Bytes held by the text buffer, offsets and null flags."""
+        return len(self.data) + self.offsets.nbytes + self.missing.nbytes
+
+class CatalogSnapshot:
+    """Immutable columnar copy of the products table, sorted by product id.
+    
+    Numbers live in NumPy arrays, text in packed StringColumns and
+    categories and brands as int32 codes into interned value lists (-1 when
+    missing), so the whole catalog costs a few compact buffers instead of
+    an ORM entity per product. Changes produce a new snapshot; readers keep
+    using the one they obtained.
+    """
+    
+    # Per-row columns, all in the same (product id) order
+    COLUMNS = (
+        'ids', 'names', 'descriptions', 'price', 'category_codes', 'brand_codes', 'stock', 'image_urls',
+        'rating', 'is_featured', 'is_on_sale', 'sale_price', 'display_price', 'created_at', 'missing'
+    )
+    
+    def __init__(self, columns, categories, brands, price_order=None):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.categories = categories
+        self.brands = brands
+        self._price_order = price_order
+        self._ordered_prices = None
+    
+    @classmethod
+    def from_rows(cls, rows, categories=(), brands=()):
+        """Build a snapshot from rows of SNAPSHOT_COLUMNS values."""
+        categories, brands = list(categories), list(brands)
+        category_lookup = {value: code for code, value in enumerate(categories)}
+        brand_lookup = {value: code for code, value in enumerate(brands)}
+        
+        def code(lookup, values, value):
+            if not value:
+                return -1
+            if value not in lookup:
+                lookup[value] = len(values)
+                values.append(value)
+            return lookup[value]
+        
+        rows = sorted(rows, key=lambda row: row[0])
+        count = len(rows)
+        fields = dict(zip((column.key for column in SNAPSHOT_COLUMNS), zip(*rows))) if rows else {
+            column.key: () for column in SNAPSHOT_COLUMNS
+        }
+        
+        def numbers(field, dtype):
+            return np.fromiter((value or 0 for value in fields[field]), dtype=dtype, count=count)
+        
+        columns = {
+            'ids': numbers('id', np.int64),
+            'names': StringColumn.from_values(fields['name']),
+            'descriptions': StringColumn.from_values(fields['description']),
+            'price': numbers('price', np.float64),
+            'category_codes': np.fromiter(
+                (code(category_lookup, categories, value) for value in fields['category']), dtype=np.int32, count=count
+            ),
+            'brand_codes': np.fromiter(
+                (code(brand_lookup, brands, value) for value in fields['brand']), dtype=np.int32, count=count
+            ),
+            'stock': numbers('stock_quantity', np.int64),
+            'image_urls': StringColumn.from_values(fields['image_url']),
+            'rating': numbers('rating', np.float64),
+            'is_featured': numbers('is_featured', bool),
+            'is_on_sale': numbers('is_on_sale', bool),
+            'sale_price': numbers('sale_price', np.float64),
+            'created_at': np.array(fields['created_at'], dtype='datetime64[us]').reshape(count),
+            'missing': np.array(
+                [[value is None for value in fields[field]] for field in NULLABLE_FIELDS], dtype=bool
+            ).T.reshape(count, len(NULLABLE_FIELDS)).copy()
+        }
+        columns['display_price'] = np.where(
+            columns['is_on_sale'] & (columns['sale_price'] != 0), columns['sale_price'], columns['price']
+        )
+        return cls(columns, categories, brands)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the column buffers."""
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS)
+    
+    @property
+    def price_order(self):
+        """Row positions in (price, id) order, the listing order; sorted once per snapshot."""
+        if self._price_order is None:
+            self._price_order = np.lexsort((self.ids, self.price))
+        return self._price_order
+    
+    @property
+    def ordered_prices(self):
+        """Prices in price_order, for seeking to a cursor."""
+        if self._ordered_prices is None:
+            self._ordered_prices = self.price[self.price_order]
+        return self._ordered_prices
+    
+    def with_changes(self, upserted, deleted_ids):
+        """Get a new snapshot with product dictionaries upserted and ids removed.
+        
+        Existing products are overwritten at their positions and new ones
+        inserted at theirs, so the id order holds without re-sorting, and
+        the (price, id) order is carried over with just the changed rows
+        moved. Each column is copied at most once; unchanged text columns
+        are shared with this snapshot.
+        """
+        added = CatalogSnapshot.from_rows([
+            tuple(product.get(column.key) for column in SNAPSHOT_COLUMNS) for product in upserted
+        ], self.categories, self.brands)
+        
+        # Rows to drop: deleted products still present
+        snapshot, order = self, self._price_order
+        removed = np.isin(self.ids, np.fromiter(deleted_ids, dtype=np.int64)) if len(deleted_ids) else None
+        if removed is not None and removed.any():
+            kept = np.flatnonzero(~removed)
+            if order is not None:
+                remap = np.cumsum(~removed) - 1
+                order = remap[order[~removed[order]]]
+            snapshot = self._take(kept)
+            snapshot._price_order = order
+        
+        positions, found = snapshot.positions(added.ids)
+        inserted = np.flatnonzero(~found)
+        insert_at = np.searchsorted(snapshot.ids, added.ids[inserted])
+        
+        columns = {}
+        for name in self.COLUMNS:
+            column, added_column = getattr(snapshot, name), getattr(added, name)
+            if isinstance(column, StringColumn):
+                if len(positions):
+                    column = column.replace(positions, added_column, np.flatnonzero(found))
+                if len(inserted):
+                    column = column.insert(insert_at, added_column.take(inserted))
+            else:
+                if len(positions):
+                    column = column.copy()
+                    column[positions] = added_column[found]
+                if len(inserted):
+                    column = np.insert(column, insert_at, added_column[inserted], axis=0)
+            columns[name] = column
+        
+        if order is not None:
+            order = self._reordered(order, positions, insert_at, columns)
+        return CatalogSnapshot(columns, added.categories, added.brands, order)
+    
+    @staticmethod
+    def _reordered(order, replaced, insert_at, columns):
+        """Carry a (price, id) order over replaced rows and rows inserted before insert_at."""
+        moved = np.zeros(len(order), dtype=bool)
+        moved[replaced] = True
+        order = order[~moved[order]]
+        
+        # Shift positions past the inserted rows, then list every changed row in its new position
+        order = order + np.searchsorted(insert_at, order, side='right')
+        changed = np.concatenate([
+            replaced + np.searchsorted(insert_at, replaced, side='right'),
+            insert_at + np.arange(len(insert_at))
+        ]).astype(np.int64)
+        
+        prices, ids = columns['price'], columns['ids']
+        changed = changed[np.lexsort((ids[changed], prices[changed]))]
+        ordered_prices = prices[order]
+        slots = []
+        for position in changed:
+            first = np.searchsorted(ordered_prices, prices[position], side='left')
+            last = np.searchsorted(ordered_prices, prices[position], side='right')
+            slots.append(first + np.searchsorted(ids[order[first:last]], ids[position]))
+        return np.insert(order, np.array(slots, dtype=np.int64), changed)
+    
+    def _take(self, positions):
+        """Get a new snapshot of the rows at positions, in that order."""
+        columns = {}
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            columns[name] = column.take(positions) if isinstance(column, StringColumn) else column[positions]
+        return CatalogSnapshot(columns, self.categories, self.brands)
+    
+    def positions(self, ids):
+        """Locate product ids; returns (positions of the ids present, mask of which ids were present)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.empty(0, dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        positions = np.searchsorted(self.ids, ids).clip(max=len(self.ids) - 1)
+        found = self.ids[positions] == ids
+        return positions[found], found
+    
+    def filter_masks(self, positions=None, categories=(), brands=(), min_price=None, max_price=None,
+                     featured=None, on_sale=None):
+        """Get a {filter: mask over positions} for each active search filter.
+        
+        Positions default to every row. Like the SQL filters, a product
+        matches when its category contains any of the categories and its
+        brand any of the brands, case-insensitively, its price is within
+        range and its flags equal the requested ones.
+        """
+        rows = slice(None) if positions is None else positions
+        masks = {}
+        if categories:
+            masks['category'] = self.code_mask(self.category_codes[rows], self.categories, categories)
+        if brands:
+            masks['brand'] = self.code_mask(self.brand_codes[rows], self.brands, brands)
+        if min_price is not None or max_price is not None:
+            prices = self.price[rows]
+            mask = np.ones(len(prices), dtype=bool)
+            if min_price is not None:
+                mask &= prices >= min_price
+            if max_price is not None:
+                mask &= prices <= max_price
+            masks['price'] = mask
+        for name, field, value in (('featured', 'is_featured', featured), ('on_sale', 'is_on_sale', on_sale)):
+            if value is not None:
+                missing = self.missing[rows, NULLABLE_FIELDS.index(field)]
+                masks[name] = (getattr(self, field)[rows] == bool(value)) & ~missing
+        return masks
+    
+    def matches(self, positions=None, **filters):
+        """Get a mask over positions (every row by default) of products matching all filter_masks filters."""
+        mask = np.ones(len(self) if positions is None else len(positions), dtype=bool)
+        for filter_mask in self.filter_masks(positions, **filters).values():
+            mask &= filter_mask
+        return mask
+    
+    def code_mask(self, codes, values, needles):
+        """Get a mask of the codes whose interned value contains any needle."""
+        # Lookup table indexed by code; the extra last entry is what missing (-1) codes read
+        lookup = np.zeros(len(values) + 1, dtype=bool)
+        lookup[self.matching_codes(values, needles)] = True
+        return lookup[codes]
+    
+    def matching_codes(self, values, needles):
+        """Get codes of interned values containing any needle."""
+        needles = [needle.lower() for needle in needles]
+        return np.array([
+            code for code, value in enumerate(values)
+            if any(needle in value.lower() for needle in needles)
+        ], dtype=np.int32)
+    
+    def page(self, limit, offset=0, after=None, **filters):
+        """Get a page of products matching filter_masks filters in (price, id) order.
+        
+        Seeks into price_order past an optional (price, id) cursor (ignoring
+        offset), then tests the filters on growing chunks of rows only until
+        offset + limit + 1 matches are found, so a page costs about what it
+        skips and returns rather than the whole catalog. Returns (page
+        positions, whether more rows follow).
+        """
+        order = self.price_order
+        prices = self.ordered_prices
+        
+        # The price range is a slice of the order, like a seek on the (price, id) index
+        min_price, max_price = filters.pop('min_price', None), filters.pop('max_price', None)
+        start = 0 if min_price is None else int(np.searchsorted(prices, min_price, side='left'))
+        end = len(order) if max_price is None else int(np.searchsorted(prices, max_price, side='right'))
+        if after is not None:
+            after_price, after_id = after
+            first = max(start, int(np.searchsorted(prices, after_price, side='left')))
+            last = max(first, min(end, int(np.searchsorted(prices, after_price, side='right'))))
+            start = first + int(np.searchsorted(self.ids[order[first:last]], after_id, side='right'))
+            offset = 0
+        
+        wanted = offset + limit + 1
+        if not any(value not in (None, (), []) for value in filters.values()):
+            found = order[start:end][offset:wanted]
+            return found[:limit], len(found) > limit
+        
+        found = []
+        count = 0
+        chunk_size = max(1024, 4 * wanted)
+        while start < end and count < wanted:
+            chunk = order[start:min(start + chunk_size, end)]
+            matched = chunk[self.matches(chunk, **filters)]
+            found.append(matched)
+            count += len(matched)
+            start += chunk_size
+            chunk_size *= 4
+        found = np.concatenate(found)[offset:wanted] if found else np.empty(0, dtype=np.int64)
+        return found[:limit], len(found) > limit
+    
+    def product(self, position, fields=PRODUCT_FIELDS):
+        """Get the product at a row position as a dictionary, like Product.to_dict, limited to fields."""
+        return {field: PRODUCT_FIELD_READERS[field](self, position) for field in fields}
+
+def _nullable(field, array, convert):
+    """Read a nullable numeric field, honouring CatalogSnapshot.missing."""
+    index = NULLABLE_FIELDS.index(field)
+    return lambda snapshot, position: (
+        None if snapshot.missing[position, index] else convert(getattr(snapshot, array)[position])
+    )
+
+def _interned(codes, values):
+    """Read an interned category or brand."""
+    def read(snapshot, position):
+        code = getattr(snapshot, codes)[position]
+        return getattr(snapshot, values)[code] if code >= 0 else None
+    return read
+
+def _created_at(snapshot, position):
+    value = snapshot.created_at[position]
+    return None if np.isnat(value) else value.item().isoformat()
+
+# How each product field is read from a snapshot row
+PRODUCT_FIELD_READERS = {
+    'id': lambda snapshot, position: int(snapshot.ids[position]),
+    'name': lambda snapshot, position: snapshot.names.get(position),
+    'description': lambda snapshot, position: snapshot.descriptions.get(position),
+    'price': lambda snapshot, position: float(snapshot.price[position]),
+    'category': _interned('category_codes', 'categories'),
+    'brand': _interned('brand_codes', 'brands'),
+    'stock_quantity': _nullable('stock_quantity', 'stock', int),
+    'image_url': lambda snapshot, position: snapshot.image_urls.get(position),
+    'rating': _nullable('rating', 'rating', float),
+    'is_featured': _nullable('is_featured', 'is_featured', bool),
+    'is_on_sale': _nullable('is_on_sale', 'is_on_sale', bool),
+    'sale_price': _nullable('sale_price', 'sale_price', float),
+    'display_price': lambda snapshot, position: float(snapshot.display_price[position]),
+    'created_at': _created_at
+}
+
+class ProductCatalog:
+    """Holds the current CatalogSnapshot, built at startup and swapped on product changes."""
+    
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.RLock()
+    
+    def build(self, db_session=None):
+        """(Re)build the snapshot from the products table."""
+        session = db_session or db_manager.get_session()
+        try:
+            rows = session.query(*SNAPSHOT_COLUMNS).all()
+        finally:
+            if db_session is None:
+                db_manager.close_session(session)
+        
+        snapshot = CatalogSnapshot.from_rows(rows)
+        with self._lock:
+            self._snapshot = snapshot
+    
+    def snapshot(self):
+        """Get the current snapshot, building it on first use."""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.build()
+        return self._snapshot
+    
+    def stats(self):
+        """Get the snapshot's product count and column memory, or None before it is built."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return {'products': len(snapshot), 'bytes': snapshot.nbytes}
+    
+    def apply_changes(self, upserted, deleted_ids):
+        """Swap in a snapshot with committed product changes (see DatabaseManager.add_product_listener)."""
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot.with_changes(upserted, deleted_ids)
+
+# Global product catalog snapshot, kept current by committed product changes
+product_catalog = ProductCatalog()
+db_manager.add_product_listener(product_catalog.apply_changes)
@@ -0,0 +1,208 @@
+"""
+Product change feed: replays catalog writes made by other processes from the product_changes log.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models import Product, ProductChange, db_manager
+
+logger = logging.getLogger(__name__)
+
+class ProductChangeFeed:
+    """Polls product_changes past the last applied sequence and passes the deltas to product listeners.
+    
+    Triggers log every product write, so a worker also sees changes committed
+    by other gunicorn workers, init_db or bulk loads, and only reloads the
+    products that changed. Its own commits reached listeners when they
+    committed, so their entries are skipped. When more than reload_threshold
+    changes are pending, or the log was pruned past the last applied sequence,
+    the reload callback rebuilds everything instead. SQLite's single writer keeps sequence order
+    equal to commit order.
+    """
+    
+    def __init__(self, interval_ms=1000, reload_threshold=5000, retention_hours=24, batch_size=500):
+        self.interval = interval_ms / 1000.0
+        self.reload_threshold = reload_threshold
+        self.retention = timedelta(hours=retention_hours)
+        self.batch_size = batch_size
+        self.last_seq = None
+        self._reload = None
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self.polls = 0
+        self.applied_products = 0
+        self.skipped_local = 0
+        self.reloads = 0
+        self.errors = 0
+    
+    def latest_sequence(self, db_session=None):
+        """Get the newest logged sequence number, 0 when the log is empty."""
+        session = db_session or db_manager.get_session()
+        try:
+            return session.query(func.max(ProductChange.seq)).scalar() or 0
+        finally:
+            if db_session is None:
+                db_manager.close_session(session)
+    
+    def changes_since(self, seq, limit=None, db_session=None):
+        """Get (seq, product_id, operation) rows logged after seq, oldest first."""
+        session = db_session or db_manager.get_session()
+        try:
+            query = session.query(ProductChange.seq, ProductChange.product_id, ProductChange.operation).filter(
+                ProductChange.seq > seq
+            ).order_by(ProductChange.seq)
+            if limit is not None:
+                query = query.limit(limit)
+            return query.all()
+        finally:
+            if db_session is None:
+                db_manager.close_session(session)
+    
+    def mark_current(self):
+        """Treat everything logged so far as applied; call before building in-memory catalog state."""
+        with self._lock:
+            self.last_seq = self.latest_sequence()
+            db_manager.forget_local_changes(self.last_seq)
+    
+    def start(self, reload=None):
+        """Poll in the background, calling reload() when a full rebuild is needed."""
+        self._reload = reload
+        if self.last_seq is None:
+            self.mark_current()
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name='product-change-feed', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop background polling."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+    
+    def poll(self):
+        """Apply changes logged since the last poll; returns how many products were updated incrementally."""
+        with self._lock:
+            if self.last_seq is None:
+                self.last_seq = self.latest_sequence()
+                return 0
+            
+            session = db_manager.get_session()
+            try:
+                self.polls += 1
+                rows = self.changes_since(self.last_seq, self.reload_threshold + 1, session)
+                if not rows:
+                    return 0
+                
+                if len(rows) > self.reload_threshold or self._pruned_past(session, rows[0].seq):
+                    return self._reload_all(session)
+                
+                # Only each product's latest operation matters, and this process applied its own already
+                local = db_manager.local_changes(row.seq for row in rows)
+                operations = {}
+                for seq, product_id, operation in rows:
+                    operations[product_id] = None if seq in local else operation
+                skipped = [product_id for product_id, operation in operations.items() if operation is None]
+                for product_id in skipped:
+                    del operations[product_id]
+                
+                if operations:
+                    upserted, deleted_ids = self._load_changes(session, operations)
+                    db_manager.notify_product_changes(upserted, deleted_ids)
+                self.last_seq = rows[-1].seq
+                db_manager.forget_local_changes(self.last_seq)
+                self.applied_products += len(operations)
+                self.skipped_local += len(skipped)
+                return len(operations)
+            finally:
+                db_manager.close_session(session)
+    
+    def prune(self):
+        """Delete log entries older than the retention period; returns how many were removed.
+        
+        The newest entry is always kept: its sequence number is the catalog version behind ETags.
+        """
+        cutoff = datetime.utcnow() - self.retention
+        session = db_manager.get_session()
+        try:
+            removed = session.query(ProductChange).filter(
+                ProductChange.changed_at < cutoff, ProductChange.seq < self.latest_sequence(session)
+            ).delete(synchronize_session=False)
+            session.commit()
+            return removed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            db_manager.close_session(session)
+    
+    def stats(self):
+        """Get the last applied sequence and poll counters."""
+        return {
+            'last_seq': self.last_seq,
+            'polls': self.polls,
+            'applied_products': self.applied_products,
+            'skipped_local': self.skipped_local,
+            'reloads': self.reloads,
+            'errors': self.errors
+        }
+    
+    def _pruned_past(self, session, first_seq):
+        """Whether entries after the last applied sequence were pruned before this process read them."""
+        if first_seq == self.last_seq + 1:
+            return False
+        oldest = session.query(func.min(ProductChange.seq)).scalar()
+        return oldest is not None and oldest > self.last_seq + 1
+    
+    def _load_changes(self, session, operations):
+        """Load upserted products as dictionaries; products gone since they were logged count as deleted."""
+        upsert_ids = [product_id for product_id, operation in operations.items() if operation == 'upsert']
+        upserted = []
+        for start in range(0, len(upsert_ids), self.batch_size):
+            chunk = upsert_ids[start:start + self.batch_size]
+            upserted.extend(product.to_dict() for product in session.query(Product).filter(Product.id.in_(chunk)))
+        
+        found = {product['id'] for product in upserted}
+        deleted_ids = sorted(
+            product_id for product_id, operation in operations.items()
+            if operation == 'delete' or product_id not in found
+        )
+        return upserted, deleted_ids
+    
+    def _reload_all(self, session):
+        """Rebuild everything through the reload callback and skip to the newest sequence."""
+        # Read the target first so writes during the rebuild are replayed, not lost
+        latest = self.latest_sequence(session)
+        if self._reload is not None:
+            self._reload()
+        self.last_seq = latest
+        db_manager.forget_local_changes(latest)
+        self.reloads += 1
+        return 0
+    
+    def _run(self):
+        """Poll every interval until stopped, pruning the log about once an hour."""
+        while not self._stopping.wait(self.interval):
+            try:
+                self.poll()
+                if time.monotonic() - self._last_prune > 3600:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception:
+                self.errors += 1
+                logger.exception("Product change feed poll failed")
+
+# Global change feed; CATALOG_CHANGE_POLL_MS=0 turns off background polling
+change_feed = ProductChangeFeed(
+    interval_ms=int(os.environ.get('CATALOG_CHANGE_POLL_MS', 1000)),
+    reload_threshold=int(os.environ.get('CATALOG_CHANGE_RELOAD_THRESHOLD', 5000)),
+    retention_hours=float(os.environ.get('CATALOG_CHANGE_RETENTION_HOURS', 24))
+)
@@ -5,45 +5,84 @@ Chatbot logic with natural language processing for product search and recommenda
 import re
 import json
 from datetime import datetime
-from fuzzywuzzy import fuzz
-from sqlalchemy import or_, and_
+import numpy as np
+from sqlalchemy import func, tuple_
 from models import Product, ChatSession, ChatMessage, db_manager, User
+from search_index import product_index
+from catalog import product_catalog
+from ranking import ProductRanker, parse_weights
+from intents import (
+    IntentClassifier, DEFAULT_CATEGORY_KEYWORDS, DEFAULT_BRAND_KEYWORDS,
+    GREETING_PHRASES, SEARCH_VERBS, SEARCH_NOUNS, SEARCH_PHRASES, HELP_PHRASES
+)
+from cache import QueryCache
+from pagination import encode_cursor, decode_cursor
+from write_behind import ChatWriteBehind
+from spelling import SpellingCorrector, WORD_PATTERN, COMMON_WORDS
+from metrics import request_metrics
+import os
 import secrets
 
+PRICE_TOKEN = re.compile(r'\$?\d+(?:\.\d+)?')
+
+STOP_WORDS = {
+    'i', 'need', 'want', 'looking', 'for', 'show', 'me', 'find', 'get', 'a', 'an', 'the', 'some', 'any',
+    # Price qualifiers are already captured as min/max price
+    'under', 'below', 'less', 'than', 'over', 'above', 'more', 'between', 'and'
+}
+
 class ChatbotEngine:
     """Main chatbot engine for processing user queries and generating responses."""
     
     def __init__(self):
-        self.greeting_patterns = [
-            r'\b(hi|hello|hey|good morning|good afternoon|good evening)\b',
-            r'\b(howdy|greetings|what\'s up|whats up)\b'
-        ]
-        
         self.search_patterns = {
-            'product_search': [
-                r'\b(show|find|search|look for|get|need|want)\b.*\b(product|item|thing)\b',
-                r'\b(i need|i want|looking for|searching for)\b',
-                r'\b(show me|find me|get me)\b'
-            ],
             'price_filter': [
                 r'\$(\d+(?:\.\d{2})?)',
                 r'\b(under|below|less than|cheaper than)\s*\$?(\d+)',
                 r'\b(over|above|more than|expensive than)\s*\$?(\d+)',
                 r'\b(between)\s*\$?(\d+)\s*(?:and|to|-)\s*\$?(\d+)\b'
             ],
-            'category_keywords': {
-                'smartphones': ['phone', 'smartphone', 'mobile', 'cell phone', 'iphone', 'android'],
-                'laptops': ['laptop', 'computer', 'notebook', 'macbook', 'pc'],
-                'headphones': ['headphone', 'earphone', 'earbuds', 'headset', 'airpods'],
-                'tablets': ['tablet', 'ipad', 'surface'],
-                'smartwatches': ['watch', 'smartwatch', 'fitness tracker'],
-                'accessories': ['case', 'charger', 'cable', 'adapter', 'stand']
-            },
-            'brand_keywords': [
-                'apple', 'samsung', 'google', 'microsoft', 'sony', 'bose', 'jbl',
-                'dell', 'hp', 'lenovo', 'asus', 'acer', 'huawei', 'xiaomi', 'oneplus'
-            ]
+            'category_keywords': DEFAULT_CATEGORY_KEYWORDS,
+            'brand_keywords': DEFAULT_BRAND_KEYWORDS
         }
+        
+        # Greeting, search, help, category and brand vocabularies compiled once
+        self.intent_classifier = IntentClassifier(
+            self.search_patterns['category_keywords'],
+            self.search_patterns['brand_keywords']
+        )
+        
+        # Typo-tolerant matching against category, brand and product-name words
+        self.spelling = SpellingCorrector()
+        self._add_spelling_terms(self.search_patterns['category_keywords'], self.search_patterns['brand_keywords'])
+        
+        # Conversational words that must never be "corrected" into catalog terms
+        self.known_words = set(STOP_WORDS) | COMMON_WORDS
+        for phrase in GREETING_PHRASES + SEARCH_VERBS + SEARCH_NOUNS + SEARCH_PHRASES + HELP_PHRASES:
+            self.known_words.update(WORD_PATTERN.findall(phrase))
+        
+        # Search results keyed on normalized criteria, dropped on any product write
+        self.search_cache = QueryCache(
+            max_entries=int(os.environ.get('SEARCH_CACHE_SIZE', 1024)),
+            ttl_seconds=float(os.environ.get('SEARCH_CACHE_TTL', 300))
+        )
+        
+        # Candidate ranking, e.g. SEARCH_RANKING_WEIGHTS="relevance=4,rating=1,price=0.5"
+        self.ranker = ProductRanker(parse_weights(os.environ.get('SEARCH_RANKING_WEIGHTS')))
+        
+        # Optionally batch chat message inserts on a background writer
+        self.write_behind = None
+        if os.environ.get('CHAT_WRITE_BEHIND', 'false').lower() == 'true':
+            self.write_behind = ChatWriteBehind(
+                interval_ms=int(os.environ.get('CHAT_WRITE_BEHIND_INTERVAL_MS', 50)),
+                batch_rows=int(os.environ.get('CHAT_WRITE_BEHIND_BATCH_ROWS', 500)),
+                max_queue=int(os.environ.get('CHAT_WRITE_BEHIND_QUEUE_SIZE', 10000)),
+                put_timeout_ms=int(os.environ.get('CHAT_WRITE_BEHIND_PUT_TIMEOUT_MS', 100))
+            )
+            self.write_behind.start()
+        
+        # Recognize brands and categories added to the catalog
+        db_manager.add_product_listener(self._on_product_changes)
     
     def process_message(self, user_id, message, session_token=None):
         """Process incoming user message and generate response."""
@@ -54,37 +93,22 @@ class ChatbotEngine:
                 session_token = self._create_session_token()
             
             chat_session = self._get_or_create_chat_session(session, user_id, session_token)
-            
-            # Save user message
-            user_message = ChatMessage(
-                session_id=chat_session.id,
-                message_type='user',
-                content=message,
-                timestamp=datetime.utcnow()
-            )
-            session.add(user_message)
+            session_id = chat_session.id
+            received_at = datetime.utcnow()
             
             # Generate bot response
             response = self._generate_response(session, message)
             
-            # Save bot response
-            bot_message = ChatMessage(
-                session_id=chat_session.id,
-                message_type='bot',
-                content=response['text'],
-                timestamp=datetime.utcnow(),
-                message_metadata=json.dumps(response.get('metadata', {}))
-            )
-            session.add(bot_message)
-            
-            session.commit()
+            # Save user message and bot response
+            with request_metrics.stage('persist'):
+                self._persist_exchange(session, chat_session, message, received_at, response)
             
             return {
                 'response': response,
                 'session_token': session_token,
-                'session_id': chat_session.id
+                'session_id': session_id
             }
-            
+        
         except Exception as e:
             session.rollback()
             return {
@@ -97,118 +121,287 @@ class ChatbotEngine:
         finally:
             db_manager.close_session(session)
     
+    def stream_message(self, user_id, message, session_token=None):
+        """Generate a response progressively as (event, data) pairs.
+        
+        Emits 'start' with the session token and intent as soon as the message
+        is classified, a 'text' header, one 'product' per row as the search
+        query returns it, and a final 'done' with the complete response. The
+        exchange is not persisted here; call save_exchange once the stream
+        has been delivered.
+        """
+        if not session_token:
+            session_token = self._create_session_token()
+        
+        message_lower, corrections, classification = self._classify_message(message)
+        intent = classification['intent']
+        yield 'start', {
+            'session_token': session_token,
+            'intent': intent,
+            'intents': classification['intents']
+        }
+        
+        if intent != 'product_search':
+            responses = {'greeting': self._greeting_response, 'help': self._help_response}
+            response = responses.get(intent, self._default_response)()
+            yield 'text', {'text': response['text']}
+            yield 'done', {'response': response, 'session_token': session_token}
+            return
+        
+        session = db_manager.get_session()
+        try:
+            criteria = self._extract_search_criteria(message_lower, classification)
+            yield 'text', {'text': "🔎 Searching our catalog for you..."}
+            
+            products = []
+            for product in self._iter_products(session, criteria):
+                products.append(product)
+                yield 'product', product
+            
+            response = self._note_corrections(self._product_list_response(products, criteria), corrections)
+        except Exception as e:
+            response = {
+                'text': f"Sorry, I had trouble searching for products. Error: {str(e)}",
+                'type': 'error'
+            }
+        finally:
+            db_manager.close_session(session)
+        
+        yield 'done', {'response': response, 'session_token': session_token}
+    
+    def save_exchange(self, user_id, session_token, message, response, received_at=None):
+        """Persist a user message and the bot response produced for it."""
+        session = db_manager.get_session()
+        try:
+            chat_session = self._get_or_create_chat_session(session, user_id, session_token)
+            session_id = chat_session.id
+            self._persist_exchange(session, chat_session, message, received_at or datetime.utcnow(), response)
+            return session_id
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            db_manager.close_session(session)
+    
+    def _persist_exchange(self, db_session, chat_session, message, received_at, response):
+        """Commit an exchange, handing its messages to the write-behind queue when enabled."""
+        rows = self._exchange_rows(chat_session.id, message, received_at, response)
+        
+        if self.write_behind is not None:
+            # Commit a newly created chat session so the batch can reference it
+            db_session.commit()
+            if self.write_behind.submit(rows, key=chat_session.user_id):
+                return
+        
+        # Write synchronously, also when the write-behind queue stays full
+        db_session.add_all(ChatMessage(**row) for row in rows)
+        chat_session.updated_at = rows[-1]['timestamp']
+        db_session.commit()
+    
+    def _exchange_rows(self, session_id, message, received_at, response):
+        """Build ChatMessage rows for the user message and, when there is one, the bot response."""
+        rows = [{
+            'session_id': session_id,
+            'message_type': 'user',
+            'content': message,
+            'timestamp': received_at
+        }]
+        
+        if response is not None:
+            rows.append({
+                'session_id': session_id,
+                'message_type': 'bot',
+                'content': response['text'],
+                'timestamp': datetime.utcnow(),
+                'message_metadata': json.dumps(response.get('metadata', {}))
+            })
+        
+        return rows
+    
     def _generate_response(self, db_session, message):
         """Generate appropriate response based on user message."""
-        message_lower = message.lower()
+        message_lower, corrections, classification = self._classify_message(message)
+        intent = classification['intent']
         
-        # Check for greetings
-        if self._is_greeting(message_lower):
+        if intent == 'greeting':
             return self._greeting_response()
         
-        # Check for product search
-        if self._is_product_search(message_lower):
-            return self._search_products(db_session, message_lower)
+        if intent == 'product_search':
+            with request_metrics.stage('search'):
+                response = self._search_products(db_session, message_lower, classification)
+            return self._note_corrections(response, corrections)
         
-        # Check for help request
-        if any(word in message_lower for word in ['help', 'what can you do', 'how does this work']):
+        if intent == 'help':
             return self._help_response()
         
         # Default response with suggestions
         return self._default_response()
     
-    def _is_greeting(self, message):
-        """Check if message is a greeting."""
-        for pattern in self.greeting_patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                return True
-        return False
-    
-    def _is_product_search(self, message):
-        """Check if message is a product search query."""
-        for pattern in self.search_patterns['product_search']:
-            if re.search(pattern, message, re.IGNORECASE):
-                return True
+    def _classify_message(self, message):
+        """Spell-correct and classify a message; returns (corrected_message, corrections, classification).
         
-        # Also check for category keywords
-        for category, keywords in self.search_patterns['category_keywords'].items():
-            if any(keyword in message for keyword in keywords):
-                return True
-        
-        return False
+        The intent is read from the corrected text, but category and brand
+        filters only come from words the user actually typed, so a wrong
+        correction can widen a keyword search but never filter it away.
+        """
+        message_lower = message.lower()
+        with request_metrics.stage('spelling'):
+            corrected, corrections = self._correct_spelling(message_lower)
+        with request_metrics.stage('classification'):
+            classification = self.intent_classifier.classify(corrected)
+            if corrections:
+                classification.update(self.intent_classifier.entities.extract(message_lower))
+        return corrected, corrections, classification
     
-    def _search_products(self, db_session, message):
+    def _correct_spelling(self, message):
+        """Replace misspelled catalog words in a lowercase message; returns (message, corrections)."""
+        return self.spelling.correct(message, self._is_known_word)
+    
+    def _is_known_word(self, word):
+        """Whether a word is correctly spelled conversation or catalog text."""
+        return word in self.known_words or product_index.has_token(word)
+    
+    def _note_corrections(self, response, corrections):
+        """Record the spelling corrections a product search was run with."""
+        if corrections and 'metadata' in response:
+            response['metadata']['spelling_corrections'] = corrections
+        return response
+    
+    def _search_products(self, db_session, message, classification=None):
         """Search for products based on user message."""
         try:
             # Extract search criteria
-            criteria = self._extract_search_criteria(message)
-            
-            # Build query
-            query = db_session.query(Product)
-            
-            # Apply filters
-            if criteria['keywords']:
-                keyword_filter = []
-                for keyword in criteria['keywords']:
-                    keyword_filter.append(Product.name.ilike(f'%{keyword}%'))
-                    keyword_filter.append(Product.description.ilike(f'%{keyword}%'))
-                query = query.filter(or_(*keyword_filter))
-            
-            if criteria['category']:
-                query = query.filter(Product.category.ilike(f'%{criteria["category"]}%'))
-            
-            if criteria['brand']:
-                query = query.filter(Product.brand.ilike(f'%{criteria["brand"]}%'))
-            
-            if criteria['min_price'] is not None:
-                query = query.filter(Product.price >= criteria['min_price'])
-            
-            if criteria['max_price'] is not None:
-                query = query.filter(Product.price <= criteria['max_price'])
+            criteria = self._extract_search_criteria(message, classification)
             
             # Get results
-            products = query.limit(10).all()
-            
-            if not products:
-                return {
-                    'text': "I couldn't find any products matching your criteria. Try being more specific or browse our categories.",
-                    'type': 'no_results'
-                }
-            
-            # Format response
-            response_text = f"I found {len(products)} product{'s' if len(products) != 1 else ''} for you:\n\n"
-            
-            product_data = []
-            for product in products:
-                product_data.append(product.to_dict())
-                response_text += f"📱 **{product.name}**\n"
-                response_text += f"💰 ${product.get_display_price():.2f}"
-                if product.is_on_sale:
-                    response_text += f" ~~${product.price:.2f}~~ (On Sale!)"
-                response_text += f"\n⭐ {product.rating}/5.0 | 📦 {product.stock_quantity} in stock\n"
-                response_text += f"{product.description[:100]}...\n\n"
-            
-            return {
-                'text': response_text,
-                'type': 'product_list',
-                'products': product_data,
-                'metadata': {
-                    'search_criteria': criteria,
-                    'total_results': len(products)
-                }
-            }
+            products = self._cached_find_products(db_session, criteria)
             
+            return self._product_list_response(products, criteria)
+        
         except Exception as e:
             return {
                 'text': f"Sorry, I had trouble searching for products. Error: {str(e)}",
                 'type': 'error'
             }
     
-    def _extract_search_criteria(self, message):
+    def _product_list_response(self, products, criteria):
+        """Format found products as a chat response."""
+        if not products:
+            return {
+                'text': "I couldn't find any products matching your criteria. Try being more specific or browse our categories.",
+                'type': 'no_results'
+            }
+        
+        # Format response
+        response_text = f"I found {len(products)} product{'s' if len(products) != 1 else ''} for you:\n\n"
+        
+        for product in products:
+            response_text += f"📱 **{product['name']}**\n"
+            response_text += f"💰 ${product['display_price']:.2f}"
+            if product['is_on_sale']:
+                response_text += f" ~~${product['price']:.2f}~~ (On Sale!)"
+            response_text += f"\n⭐ {product['rating']}/5.0 | 📦 {product['stock_quantity']} in stock\n"
+            response_text += f"{(product['description'] or '')[:100]}...\n\n"
+        
+        return {
+            'text': response_text,
+            'type': 'product_list',
+            'products': products,
+            'metadata': {
+                'search_criteria': criteria,
+                'total_results': len(products)
+            }
+        }
+    
+    def _cached_find_products(self, db_session, criteria, limit=10):
+        """Find products as dictionaries, serving repeated criteria from the search cache."""
+        return list(self._iter_products(db_session, criteria, limit))
+    
+    def _iter_products(self, db_session, criteria, limit=10):
+        """Yield product dictionaries for the search criteria, caching the complete result."""
+        cache_key = self._criteria_cache_key(criteria, limit)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            # Callers get their own copies so cached entries stay untouched
+            for product in cached:
+                yield dict(product)
+            return
+        
+        generation = self.search_cache.generation
+        products = self._find_products(db_session, criteria, limit)
+        for product_data in products:
+            yield dict(product_data)
+        
+        self.search_cache.set(cache_key, products, generation)
+    
+    def _criteria_cache_key(self, criteria, limit):
+        """Normalize search criteria into a hashable cache key."""
+        return (
+            tuple(sorted({keyword.lower() for keyword in criteria['keywords']})),
+            tuple(sorted(criteria['categories'])),
+            tuple(sorted(criteria['brands'])),
+            criteria['min_price'],
+            criteria['max_price'],
+            limit
+        )
+    
+    def get_cache_stats(self):
+        """Get search cache counters."""
+        return self.search_cache.stats()
+    
+    def get_write_behind_stats(self):
+        """Get chat write-behind queue depth and counters, or None when disabled."""
+        if self.write_behind is None:
+            return None
+        return self.write_behind.stats()
+    
+    def _find_products(self, db_session, criteria, limit=10):
+        """Find products matching the extracted search criteria, best-ranked first, as dictionaries.
+        
+        Products are read from the catalog snapshot, not loaded as ORM entities.
+        """
+        snapshot = product_catalog.snapshot()
+        return [snapshot.product(position) for position in self._rank_products(snapshot, criteria, limit)]
+    
+    def _rank_products(self, snapshot, criteria, limit=10):
+        """Score every product matching the criteria on the snapshot and return the top positions, best first."""
+        relevance = None
+        matches = product_index.keyword_matches(criteria['keywords']) if criteria['keywords'] else None
+        
+        # Keywords nothing matches still leave the category and brand criteria to search by
+        if not matches and (criteria['categories'] or criteria['brands']):
+            matches = None
+        
+        if matches is not None:
+            # Keyword candidates from the inverted index, relevance = share of keywords matched
+            if not matches:
+                return np.empty(0, dtype=np.int64)
+            ids = np.fromiter(matches.keys(), dtype=np.int64, count=len(matches))
+            counts = np.fromiter(matches.values(), dtype=np.float64, count=len(matches))
+            positions, found = snapshot.positions(ids)
+            relevance = counts[found] / len(criteria['keywords'])
+        else:
+            positions = np.arange(len(snapshot))
+        
+        mask = snapshot.matches(
+            positions,
+            categories=criteria['categories'],
+            brands=criteria['brands'],
+            min_price=criteria['min_price'],
+            max_price=criteria['max_price']
+        )
+        positions = positions[mask]
+        if relevance is not None:
+            relevance = relevance[mask]
+        
+        return self.ranker.top_k(snapshot, positions, limit, relevance)
+    
+    def _extract_search_criteria(self, message, entities=None):
         """Extract search criteria from user message."""
         criteria = {
             'keywords': [],
-            'category': None,
-            'brand': None,
+            'categories': [],
+            'brands': [],
             'min_price': None,
             'max_price': None
         }
@@ -225,26 +418,91 @@ class ChatbotEngine:
                 criteria['min_price'] = min(prices[:2])
                 criteria['max_price'] = max(prices[:2])
         
-        # Extract category
-        for category, keywords in self.search_patterns['category_keywords'].items():
-            if any(keyword in message for keyword in keywords):
-                criteria['category'] = category
-                break
-        
-        # Extract brand
-        for brand in self.search_patterns['brand_keywords']:
-            if brand in message:
-                criteria['brand'] = brand
-                break
+        # Extract every category and brand mentioned
+        if entities is None:
+            entities = self.intent_classifier.entities.extract(message)
+        criteria['categories'] = list(entities['categories'])
+        criteria['brands'] = list(entities['brands'])
         
         # Extract general keywords
         words = message.split()
-        stop_words = {'i', 'need', 'want', 'looking', 'for', 'show', 'me', 'find', 'get', 'a', 'an', 'the', 'some', 'any'}
-        keywords = [word.strip('.,!?') for word in words if len(word) > 2 and word.lower() not in stop_words]
+        keywords = [word.strip('.,!?') for word in words if len(word) > 2 and word.lower() not in STOP_WORDS]
+        keywords = [keyword for keyword in keywords if not PRICE_TOKEN.fullmatch(keyword)]
         criteria['keywords'] = keywords[:3]  # Limit to 3 keywords
         
         return criteria
     
+    def refresh_vocabulary(self, db_session=None):
+        """Load category, brand and product-name vocabularies from the product catalog."""
+        session = db_session or db_manager.get_session()
+        try:
+            categories = [row[0] for row in session.query(Product.category).distinct() if row[0]]
+            brands = [row[0] for row in session.query(Product.brand).distinct() if row[0]]
+            names = [row[0] for row in session.query(Product.name)]
+        finally:
+            if db_session is None:
+                db_manager.close_session(session)
+        
+        for name in names:
+            self.spelling.add_text(name)
+        self._extend_vocabulary(categories, brands)
+    
+    def _extend_vocabulary(self, categories, brands):
+        """Add catalog categories and brands to the vocabularies and recompile the classifier."""
+        category_keywords = {
+            category: list(keywords)
+            for category, keywords in self.search_patterns['category_keywords'].items()
+        }
+        brand_keywords = list(self.search_patterns['brand_keywords'])
+        
+        for category in categories:
+            category = category.lower()
+            keywords = category_keywords.setdefault(category, [])
+            for keyword in (category, category[:-1] if category.endswith('s') else category):
+                if keyword not in keywords:
+                    keywords.append(keyword)
+        
+        for brand in brands:
+            brand = brand.lower()
+            if brand not in brand_keywords:
+                brand_keywords.append(brand)
+        
+        self._add_spelling_terms(category_keywords, brand_keywords)
+        
+        self.search_patterns['category_keywords'] = category_keywords
+        self.search_patterns['brand_keywords'] = brand_keywords
+        self.intent_classifier = IntentClassifier(category_keywords, brand_keywords)
+    
+    def _add_spelling_terms(self, category_keywords, brand_keywords):
+        """Make category keywords and brands available as spelling corrections."""
+        for keywords in category_keywords.values():
+            for keyword in keywords:
+                self.spelling.add_text(keyword)
+        for brand in brand_keywords:
+            self.spelling.add_text(brand)
+    
+    def _on_product_changes(self, upserted, deleted_ids):
+        """Invalidate cached searches and recompile the classifier for new categories or brands."""
+        self.search_cache.clear()
+        
+        for product in upserted:
+            self.spelling.add_text(product.get('name'))
+        
+        known_categories = self.search_patterns['category_keywords']
+        known_brands = set(self.search_patterns['brand_keywords'])
+        
+        categories = {
+            product['category'] for product in upserted
+            if product.get('category') and product['category'].lower() not in known_categories
+        }
+        brands = {
+            product['brand'] for product in upserted
+            if product.get('brand') and product['brand'].lower() not in known_brands
+        }
+        
+        if categories or brands:
+            self._extend_vocabulary(categories, brands)
+    
     def _greeting_response(self):
         """Generate greeting response."""
         greetings = [
@@ -315,8 +573,18 @@ Or type "help" to see what I can do! 💡""",
         """Create unique session token."""
         return secrets.token_urlsafe(32)
     
-    def get_chat_history(self, user_id, session_token=None, limit=50):
-        """Get chat history for user."""
+    def _flush_pending_messages(self, user_id):
+        """Wait for the user's queued chat messages so reads see their latest exchange."""
+        if self.write_behind is not None:
+            self.write_behind.flush(key=user_id)
+    
+    def get_chat_history(self, user_id, session_token=None, limit=50, cursor=None):
+        """Get a page of chat history for user in chronological order.
+        
+        Returns (messages, next_cursor); pass next_cursor back to load the
+        messages before this page.
+        """
+        self._flush_pending_messages(user_id)
         session = db_manager.get_session()
         try:
             query = session.query(ChatMessage).join(ChatSession).filter(
@@ -326,23 +594,59 @@ Or type "help" to see what I can do! 💡""",
             if session_token:
                 query = query.filter(ChatSession.session_token == session_token)
             
-            messages = query.order_by(ChatMessage.timestamp.desc()).limit(limit).all()
+            # Keyset pagination on (timestamp, id), newest first
+            if cursor:
+                position = decode_cursor(cursor, timestamp=str, id=int)
+                try:
+                    before = datetime.fromisoformat(position['timestamp'])
+                except ValueError:
+                    raise ValueError('Invalid cursor')
+                query = query.filter(tuple_(ChatMessage.timestamp, ChatMessage.id) < (before, position['id']))
+            
+            messages = query.order_by(
+                ChatMessage.timestamp.desc(), ChatMessage.id.desc()
+            ).limit(limit + 1).all()
             
-            return [msg.to_dict() for msg in reversed(messages)]
+            has_more = len(messages) > limit
+            messages = messages[:limit]
             
+            next_cursor = None
+            if has_more and messages:
+                oldest = messages[-1]
+                next_cursor = encode_cursor({'timestamp': oldest.timestamp.isoformat(), 'id': oldest.id})
+            
+            return [msg.to_dict() for msg in reversed(messages)], next_cursor
+        
         finally:
             db_manager.close_session(session)
     
-    def get_user_sessions(self, user_id):
-        """Get all chat sessions for a user."""
+    def get_user_sessions(self, user_id, limit=50, offset=0):
+        """Get a page of chat sessions for a user, newest first, with the total count."""
+        self._flush_pending_messages(user_id)
         session = db_manager.get_session()
         try:
-            sessions = session.query(ChatSession).filter(
+            chat_sessions = session.query(ChatSession).filter(
                 ChatSession.user_id == user_id
-            ).order_by(ChatSession.updated_at.desc()).all()
+            ).order_by(ChatSession.updated_at.desc()).offset(offset).limit(limit).all()
             
-            return [s.to_dict() for s in sessions]
+            # Count messages of just this page's sessions in one grouped query
+            message_counts = {}
+            if chat_sessions:
+                message_counts = dict(session.query(
+                    ChatMessage.session_id,
+                    func.count(ChatMessage.id)
+                ).filter(
+                    ChatMessage.session_id.in_([chat_session.id for chat_session in chat_sessions])
+                ).group_by(ChatMessage.session_id).all())
             
+            total_count = session.query(func.count(ChatSession.id)).filter(
+                ChatSession.user_id == user_id
+            ).scalar()
+            
+            return [
+                chat_session.to_dict(message_counts.get(chat_session.id, 0)) for chat_session in chat_sessions
+            ], total_count
+        
         finally:
             db_manager.close_session(session)
 
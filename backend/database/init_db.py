@@ -1,14 +1,97 @@
 """
 Database initialization script with mock e-commerce product data.
+
+Also bulk loads product catalogs from CSV/JSONL dumps or a deterministic
+generator, for staging and load-testing environments:
+    
+    python database/init_db.py                                # mock catalog and demo users
+    python database/init_db.py --reset --file catalog.jsonl   # replace products with a dump
+    python database/init_db.py --reset --generate 1000000     # replace products with generated ones
 """
 
+import argparse
+import csv
+import json
+import math
+from operator import itemgetter
 import sys
 import os
+import time
+from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models import db_manager, Product, User
+from sqlalchemy import DateTime, func, insert, literal, select, text
+from models import db_manager, Product, ProductChange, User, PRODUCT_FTS_DDL, PRODUCT_CHANGES_DDL
 import random
 
+# Rows per executemany batch when bulk loading
+DEFAULT_CHUNK_SIZE = 10000
+
+# Product columns written by the bulk loader; created_at must stay last
+LOAD_COLUMNS = (
+    'name', 'description', 'price', 'category', 'brand', 'stock_quantity', 'image_url',
+    'rating', 'is_featured', 'is_on_sale', 'sale_price', 'created_at'
+)
+LOAD_DEFAULTS = {'stock_quantity': 0, 'rating': 0.0, 'is_featured': False, 'is_on_sale': False}
+load_values = itemgetter(*LOAD_COLUMNS[:-1])
+LOAD_STATEMENT = f"INSERT INTO products ({', '.join(LOAD_COLUMNS)}) VALUES ({', '.join('?' * len(LOAD_COLUMNS))})"
+
+# Per-category noun, product lines by brand, price range and selling points for generated products
+CATEGORY_PROFILES = {
+    'smartphones': (
+        'smartphone',
+        {'Apple': ['iPhone'], 'Samsung': ['Galaxy S', 'Galaxy A'], 'Google': ['Pixel'], 'OnePlus': ['Nord', 'Ace'],
+         'Xiaomi': ['Redmi Note', 'Poco'], 'Motorola': ['Edge', 'Moto G']},
+        (149, 1599),
+        ['5G connectivity', 'an OLED display', 'a triple camera system', 'all-day battery life', 'fast charging']
+    ),
+    'laptops': (
+        'laptop',
+        {'Apple': ['MacBook Air', 'MacBook Pro'], 'Dell': ['XPS', 'Inspiron'], 'HP': ['Spectre x360', 'Pavilion'],
+         'Lenovo': ['ThinkPad X1', 'IdeaPad'], 'ASUS': ['ZenBook', 'ROG Strix'], 'Acer': ['Swift', 'Predator'],
+         'Microsoft': ['Surface Laptop']},
+        (399, 3499),
+        ['16GB of RAM', 'a 1TB SSD', 'a high-refresh display', 'dedicated graphics', 'a backlit keyboard']
+    ),
+    'headphones': (
+        'headphone',
+        {'Sony': ['WH-1000X', 'WF-1000X'], 'Bose': ['QuietComfort'], 'Apple': ['AirPods', 'AirPods Max'],
+         'Sennheiser': ['Momentum'], 'JBL': ['Live', 'Tune'], 'Beats': ['Studio', 'Solo']},
+        (29, 549),
+        ['active noise cancelling', 'wireless Bluetooth', '30-hour battery life', 'spatial audio', 'USB-C charging']
+    ),
+    'tablets': (
+        'tablet',
+        {'Apple': ['iPad', 'iPad Pro'], 'Samsung': ['Galaxy Tab S', 'Galaxy Tab A'], 'Lenovo': ['Tab P'],
+         'Amazon': ['Fire HD'], 'Microsoft': ['Surface Pro']},
+        (79, 1999),
+        ['a Liquid Retina display', 'stylus support', 'a keyboard cover', 'all-day battery life', '256GB of storage']
+    ),
+    'smartwatches': (
+        'smartwatch',
+        {'Apple': ['Watch Series'], 'Samsung': ['Galaxy Watch'], 'Garmin': ['Fenix', 'Forerunner'],
+         'Fitbit': ['Versa', 'Sense'], 'Amazfit': ['GTR', 'Bip']},
+        (49, 899),
+        ['GPS tracking', 'heart rate monitoring', 'sleep tracking', 'a week of battery life', 'water resistance']
+    ),
+    'accessories': (
+        'accessory',
+        {'Logitech': ['MX Master', 'MX Keys'], 'Anker': ['PowerCore', 'USB-C Hub'], 'Belkin': ['BoostCharge'],
+         'Razer': ['DeathAdder', 'BlackWidow'], 'Samsung': ['Wireless Charger'], 'Apple': ['MagSafe Charger']},
+        (9, 299),
+        ['USB-C', 'wireless charging', 'an ergonomic design', 'multi-device pairing', 'a braided cable']
+    ),
+    'cameras': (
+        'camera',
+        {'Canon': ['EOS R'], 'Sony': ['Alpha'], 'Nikon': ['Z'], 'Fujifilm': ['X-T', 'X-S'], 'GoPro': ['HERO']},
+        (199, 3999),
+        ['a full-frame sensor', '4K video', 'image stabilization', 'fast autofocus', 'a weather-sealed body']
+    )
+}
+VARIANTS = ['', '', ' Pro', ' Max', ' Lite', ' Plus', ' Ultra', ' SE', ' Mini']
+COLORS = ['Black', 'Silver', 'Graphite', 'Blue', 'White', 'Midnight', 'Rose Gold', 'Green']
+ADJECTIVES = ['Premium', 'Compact', 'Powerful', 'Lightweight', 'Versatile', 'Flagship', 'Affordable', 'Sleek']
+
 def create_mock_products():
     """Create 100+ mock e-commerce products."""
     
@@ -79,8 +162,190 @@ def create_sample_users():
     
     return users_data
 
-def initialize_database():
-    """Initialize the database with mock data."""
+def generate_products(count, seed=42):
+    """Yield count realistic generated products; the same seed always gives the same catalog."""
+    rng = random.Random(seed)
+    categories = sorted(CATEGORY_PROFILES)
+    created_base = datetime(2024, 1, 1)
+    
+    for i in range(count):
+        category = rng.choice(categories)
+        noun, lines, (low, high), features = CATEGORY_PROFILES[category]
+        brand = rng.choice(sorted(lines))
+        
+        # Log-uniform prices with retail .99 endings
+        price = round(math.exp(rng.uniform(math.log(low), math.log(high)))) - 0.01
+        on_sale = rng.random() < 0.15
+        selling_points = rng.sample(features, 3)
+        
+        yield {
+            'name': f"{brand} {rng.choice(lines[brand])} {rng.randint(2, 15)}{rng.choice(VARIANTS)} - {rng.choice(COLORS)}",
+            'description': (
+                f"{rng.choice(ADJECTIVES)} {noun} from {brand} with "
+                f"{selling_points[0]}, {selling_points[1]} and {selling_points[2]}."
+            ),
+            'price': price,
+            'category': category,
+            'brand': brand,
+            'stock_quantity': int(rng.expovariate(1 / 60)),
+            'image_url': f'https://images.example.com/products/{i + 1}.jpg',
+            'rating': round(rng.triangular(2.5, 5.0, 4.4), 1),
+            'is_featured': rng.random() < 0.03,
+            'is_on_sale': on_sale,
+            'sale_price': round(price * rng.uniform(0.6, 0.95), 2) if on_sale else None,
+            'created_at': created_base + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        }
+
+def parse_bool(value):
+    """Parse CSV/JSON booleans such as true, 1, yes."""
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    return str(value).strip().lower() in ('true', '1', 'yes', 'y')
+
+def normalize_product(raw, line_number=None):
+    """Convert a CSV or JSON record into Product column values; raises ValueError when invalid."""
+    def number(name, convert):
+        value = raw.get(name)
+        return None if value in (None, '') else convert(value)
+    
+    try:
+        product = {
+            'name': (raw.get('name') or '').strip(),
+            'description': raw.get('description') or None,
+            'price': number('price', float),
+            'category': (raw.get('category') or '').strip().lower(),
+            'brand': (raw.get('brand') or '').strip() or None,
+            'stock_quantity': number('stock_quantity', int) or 0,
+            'image_url': raw.get('image_url') or None,
+            'rating': number('rating', float) or 0.0,
+            'is_featured': parse_bool(raw.get('is_featured')),
+            'is_on_sale': parse_bool(raw.get('is_on_sale')),
+            'sale_price': number('sale_price', float)
+        }
+        if raw.get('created_at'):
+            product['created_at'] = datetime.fromisoformat(str(raw['created_at']))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid product on line {line_number}: {str(e)}")
+    
+    if not product['name'] or product['price'] is None or not product['category']:
+        raise ValueError(f"Invalid product on line {line_number}: name, price and category are required")
+    return product
+
+def read_products(path):
+    """Stream products from a .csv (with a header row) or .jsonl file."""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            for line_number, row in enumerate(csv.DictReader(csv_file), start=2):
+                yield normalize_product(row, line_number)
+    elif path.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as jsonl_file:
+            for line_number, line in enumerate(jsonl_file, start=1):
+                if line.strip():
+                    yield normalize_product(json.loads(line), line_number)
+    else:
+        raise ValueError(f"Unsupported catalog file '{path}', expected .csv or .jsonl")
+
+def bulk_load_products(products, reset=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert products (an iterable of dicts) in executemany chunks inside one transaction.
+    
+    When the table starts empty (or reset empties it), its secondary indexes
+    and full-text sync triggers are dropped for the load and rebuilt once at
+    the end; appends keep them, since rebuilding would cost more. SQLite
+    skips fsyncs until the load commits. Instead of a trigger firing per row,
+    the product_changes log gets one set-based insert for the deleted and one
+    for the loaded products, so running servers still pick the load up.
+    Returns the number of products inserted.
+    """
+    sqlite = db_manager.engine.dialect.name == 'sqlite'
+    indexes = list(Product.__table__.indexes)
+    fts_triggers = [statement for statement in PRODUCT_FTS_DDL if statement.startswith('CREATE TRIGGER')] if db_manager.fts_enabled else []
+    change_triggers = PRODUCT_CHANGES_DDL if db_manager.change_log_triggers else []
+    loaded = 0
+    
+    with db_manager.engine.connect() as connection:
+        if sqlite:
+            connection.exec_driver_sql('PRAGMA synchronous=OFF')
+            connection.exec_driver_sql('PRAGMA cache_size=-262144')
+            connection.exec_driver_sql('PRAGMA temp_store=MEMORY')
+            connection.commit()
+        
+        try:
+            with connection.begin():
+                rebuild = reset or connection.execute(select(Product.id).limit(1)).first() is None
+                triggers = (fts_triggers if rebuild else []) + change_triggers
+                if rebuild:
+                    for index in indexes:
+                        index.drop(connection, checkfirst=True)
+                for statement in triggers:
+                    connection.execute(text(f"DROP TRIGGER IF EXISTS {statement.split()[5]}"))
+                
+                if reset:
+                    log_product_changes(connection, 'delete')
+                    connection.execute(Product.__table__.delete())
+                last_existing_id = connection.execute(select(func.max(Product.id))).scalar() or 0
+                
+                batch = []
+                for product in products:
+                    batch.append(product)
+                    if len(batch) >= chunk_size:
+                        insert_products(connection, batch, sqlite)
+                        loaded += len(batch)
+                        batch = []
+                if batch:
+                    insert_products(connection, batch, sqlite)
+                    loaded += len(batch)
+                
+                log_product_changes(connection, 'upsert', after_id=last_existing_id)
+                
+                # Build indexes and the full-text index once, over the loaded table
+                if rebuild:
+                    for index in indexes:
+                        index.create(connection)
+                    if db_manager.fts_enabled:
+                        connection.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+                for statement in triggers:
+                    connection.execute(text(statement))
+        finally:
+            if sqlite:
+                connection.exec_driver_sql(f"PRAGMA synchronous={os.environ.get('DB_SYNCHRONOUS', 'NORMAL')}")
+                connection.exec_driver_sql('PRAGMA cache_size=-2000')
+                connection.exec_driver_sql('PRAGMA temp_store=DEFAULT')
+                connection.commit()
+    
+    return loaded
+
+def insert_products(connection, batch, sqlite):
+    """Insert one chunk of product dicts with a single executemany."""
+    if not sqlite:
+        connection.execute(insert(Product), batch)
+        return
+    
+    # Pass plain tuples straight to the driver, skipping per-row parameter processing
+    now = datetime.utcnow()
+    rows = []
+    for product in batch:
+        try:
+            values = load_values(product)
+        except KeyError:
+            values = tuple(product.get(column, LOAD_DEFAULTS.get(column)) for column in LOAD_COLUMNS[:-1])
+        # SQLAlchemy's SQLite DateTime text format
+        created_at = (product.get('created_at') or now).isoformat(' ', 'microseconds')
+        rows.append(values + (created_at,))
+    connection.exec_driver_sql(LOAD_STATEMENT, rows)
+
+def log_product_changes(connection, operation, after_id=0):
+    """Record operation in product_changes for every product with an id above after_id."""
+    connection.execute(insert(ProductChange).from_select(
+        ['product_id', 'operation', 'changed_at'],
+        select(Product.id, literal(operation), literal(datetime.utcnow(), DateTime)).where(Product.id > after_id)
+    ))
+
+def initialize_database(products=None, reset=None, chunk_size=DEFAULT_CHUNK_SIZE, create_users=True):
+    """Initialize the database with products (the mock catalog by default) and sample users.
+    
+    When products already exist, reset=True replaces them, reset=False keeps
+    them and stops, and reset=None asks interactively.
+    """
     print("Initializing database...")
     
     # Create tables
@@ -94,64 +359,60 @@ def initialize_database():
         existing_products = session.query(Product).count()
         if existing_products > 0:
             print(f"Database already contains {existing_products} products")
-            response = input("Do you want to reset the database? (y/N): ")
-            if response.lower() != 'y':
+            if reset is None:
+                response = input("Do you want to reset the database? (y/N): ")
+                reset = response.lower() == 'y'
+            if not reset:
                 print("Database initialization cancelled")
                 return
-            
-            # Clear existing data
-            session.query(Product).delete()
-            session.query(User).delete()
-            session.commit()
-            print("✓ Existing data cleared")
-        
-        # Create products
-        products_data = create_mock_products()
-        products = []
         
-        for product_data in products_data:
-            product = Product(**product_data)
-            products.append(product)
+        # End the read transaction before the load writes through its own connection
+        session.rollback()
         
-        session.add_all(products)
-        session.commit()
-        print(f"✓ Created {len(products)} products")
+        # Create products
+        start = time.perf_counter()
+        loaded = bulk_load_products(
+            products if products is not None else create_mock_products(),
+            reset=existing_products > 0,
+            chunk_size=chunk_size
+        )
+        elapsed = time.perf_counter() - start
+        print(f"✓ Created {loaded} products in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f}/s)")
         
-        # Create sample users
-        users_data = create_sample_users()
+        # Replace the sample users only once the products loaded, so a bad catalog file keeps every account
         users = []
-        
-        for user_data in users_data:
-            user = User(
-                username=user_data['username'],
-                email=user_data['email']
-            )
-            user.set_password(user_data['password'])
-            users.append(user)
-        
-        session.add_all(users)
-        session.commit()
-        print(f"✓ Created {len(users)} sample users")
+        if create_users:
+            if existing_products > 0:
+                session.query(User).delete()
+            for user_data in create_sample_users():
+                user = User(
+                    username=user_data['username'],
+                    email=user_data['email']
+                )
+                user.set_password(user_data['password'])
+                users.append(user)
+            
+            session.add_all(users)
+            session.commit()
+            print(f"✓ Created {len(users)} sample users")
         
         # Print summary
         print("\n🎉 Database initialization complete!")
-        print(f"📊 Total products: {len(products)}")
-        print(f"👥 Total users: {len(users)}")
+        print(f"📊 Total products: {loaded}")
+        print(f"👥 Total users: {session.query(User).count()}")
         
         # Print category breakdown
-        categories = {}
-        for product in products:
-            category = product.category
-            categories[category] = categories.get(category, 0) + 1
+        categories = session.query(Product.category, func.count(Product.id)).group_by(Product.category).all()
         
         print("\n📈 Product categories:")
-        for category, count in categories.items():
+        for category, count in categories:
             print(f"  • {category.title()}: {count} products")
         
-        print("\n🔐 Demo credentials:")
-        print("  Username: Adi")
-        print("  Password: Aditya123@")
-        
+        if users:
+            print("\n🔐 Demo credentials:")
+            print("  Username: Adi")
+            print("  Password: Aditya123@")
+    
     except Exception as e:
         session.rollback()
         print(f"❌ Error initializing database: {str(e)}")
@@ -159,5 +420,30 @@ def initialize_database():
     finally:
         db_manager.close_session(session)
 
+def main():
+    parser = argparse.ArgumentParser(description='Initialize the database with products and sample users.')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--file', help='Load products from a .csv or .jsonl catalog dump')
+    source.add_argument('--generate', type=int, metavar='COUNT', help='Load COUNT generated products')
+    parser.add_argument('--seed', type=int, default=42, help='Generator seed (default: 42)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per insert batch')
+    parser.add_argument('--reset', action='store_true', help='Replace existing data without asking')
+    parser.add_argument('--keep', action='store_true', help='Leave an already populated database untouched')
+    parser.add_argument('--no-users', action='store_true', help='Skip the sample users')
+    args = parser.parse_args()
+    
+    products = None
+    if args.file:
+        products = read_products(args.file)
+    elif args.generate is not None:
+        products = generate_products(args.generate, args.seed)
+    
+    reset = True if args.reset else False if args.keep or not sys.stdin.isatty() else None
+    try:
+        initialize_database(products, reset=reset, chunk_size=args.chunk_size, create_users=not args.no_users)
+    except ValueError:
+        # Invalid catalog file; the error was already reported and nothing was loaded
+        sys.exit(1)
+
 if __name__ == "__main__":
-    initialize_database()
\ No newline at end of file
+    main()
\ No newline at end of file
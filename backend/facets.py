@@ -0,0 +1,115 @@
+"""
+In-memory catalog facets: category, brand, price-range, on-sale and featured counts.
+"""
+
+import numpy as np
+from cache import QueryCache
+from catalog import product_catalog
+from models import db_manager
+
+# Upper bounds of the price ranges; the last range is open-ended
+PRICE_BUCKET_EDGES = (50, 100, 250, 500, 1000)
+
+# Facets computed by FacetIndex.facets, keyed like CatalogSnapshot.filter_masks
+FACETS = ('category', 'brand', 'price', 'on_sale', 'featured')
+
+class FacetIndex:
+    """Category/brand totals and cached facet counts computed over the catalog snapshot."""
+    
+    def __init__(self, price_bucket_edges=PRICE_BUCKET_EDGES):
+        self.price_bucket_edges = np.array(price_bucket_edges, dtype=np.float64)
+        self._cache = QueryCache(max_entries=256, ttl_seconds=3600)
+    
+    def apply_changes(self, upserted, deleted_ids):
+        """Drop cached counts after committed product changes (see DatabaseManager.add_product_listener)."""
+        self.clear()
+    
+    def clear(self):
+        """Drop all cached facet counts."""
+        self._cache.clear()
+    
+    def categories(self):
+        """Get sorted category names with their product counts."""
+        snapshot = product_catalog.snapshot()
+        return self._value_counts(snapshot.category_codes, snapshot.categories)
+    
+    def brands(self):
+        """Get sorted brand names with their product counts."""
+        snapshot = product_catalog.snapshot()
+        return self._value_counts(snapshot.brand_codes, snapshot.brands)
+    
+    def facets(self, category=None, brand=None, min_price=None, max_price=None, featured=None, on_sale=None):
+        """Count products per facet value for a filter set.
+        
+        Each facet is counted with every filter except its own applied, so the
+        counts show how many products each alternative value would give.
+        Category and brand filters match case-insensitive substrings, like
+        /api/products.
+        """
+        key = (category and category.lower(), brand and brand.lower(), min_price, max_price, featured, on_sale)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        
+        generation = self._cache.generation
+        snapshot = product_catalog.snapshot()
+        masks = snapshot.filter_masks(
+            categories=[category] if category else (),
+            brands=[brand] if brand else (),
+            min_price=min_price,
+            max_price=max_price,
+            featured=featured,
+            on_sale=on_sale
+        )
+        
+        # Rows passing every filter but the facet's own
+        everything = np.ones(len(snapshot), dtype=bool)
+        passing = {}
+        for facet in FACETS + (None,):
+            mask = everything.copy()
+            for name, filter_mask in masks.items():
+                if name != facet:
+                    mask &= filter_mask
+            passing[facet] = mask
+        
+        buckets = np.searchsorted(self.price_bucket_edges, snapshot.price[passing['price']], side='right')
+        price_counts = np.bincount(buckets, minlength=len(self.price_bucket_edges) + 1)
+        on_sale_count = int(np.count_nonzero(snapshot.is_on_sale[passing['on_sale']]))
+        featured_count = int(np.count_nonzero(snapshot.is_featured[passing['featured']]))
+        
+        bounds = (0,) + tuple(int(edge) for edge in self.price_bucket_edges) + (None,)
+        result = {
+            'total_count': int(np.count_nonzero(passing[None])),
+            'categories': [
+                {'value': value, 'count': count}
+                for value, count in self._value_counts(snapshot.category_codes[passing['category']], snapshot.categories)
+            ],
+            'brands': [
+                {'value': value, 'count': count}
+                for value, count in self._value_counts(snapshot.brand_codes[passing['brand']], snapshot.brands)
+            ],
+            'price_ranges': [
+                {'min': bounds[i], 'max': bounds[i + 1], 'count': int(count)}
+                for i, count in enumerate(price_counts)
+            ],
+            'on_sale': {
+                'true': on_sale_count,
+                'false': int(np.count_nonzero(passing['on_sale'])) - on_sale_count
+            },
+            'featured': {
+                'true': featured_count,
+                'false': int(np.count_nonzero(passing['featured'])) - featured_count
+            }
+        }
+        
+        self._cache.set(key, result, generation)
+        return result
+    
+    def _value_counts(self, codes, values):
+        """Count interned codes; returns sorted (value, count) pairs for values present."""
+        counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        return sorted((values[code], int(count)) for code, count in enumerate(counts) if count)
+
+# Global facet index, kept current by committed product changes
+facet_index = FacetIndex()
+db_manager.add_product_listener(facet_index.apply_changes)
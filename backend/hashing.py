@@ -0,0 +1,82 @@
+"""
+Password hashing on a bounded pool of worker threads.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full and a request should be retried later."""
+
+class PasswordHasher:
+    """Runs bcrypt on a fixed number of worker threads behind a bounded queue.
+    
+    At most workers hashes run at once, so a login burst cannot occupy every
+    request thread with CPU-bound work. Callers beyond workers + max_pending
+    are rejected immediately with HashingBusy instead of queueing.
+    """
+    
+    def __init__(self, workers=2, max_pending=32, rounds=12):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+    
+    def hash(self, password):
+        """Hash a password with the configured cost factor."""
+        hashed = self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+    
+    def check(self, password, hashed):
+        """Check a password against a stored hash."""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+    
+    def needs_rehash(self, hashed):
+        """Whether a stored hash uses a different cost factor than the configured one."""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+    
+    def stats(self):
+        """Get pool size and counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'rounds': self.rounds,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+    
+    def _run(self, function, *args):
+        """Run function on the pool and wait for it, or raise HashingBusy when the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy('Too many password hashing requests')
+        
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))),
+    max_pending=int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 32)),
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', 12))
+)
@@ -0,0 +1,256 @@
+"""
+Single-pass intent classification and entity detection for chatbot messages.
+"""
+
+import re
+from collections import deque
+
+GREETING_PHRASES = [
+    'hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening',
+    'howdy', 'greetings', "what's up", 'whats up'
+]
+
+# "<verb> ... <noun>", e.g. "find a good product"
+SEARCH_VERBS = ['show', 'find', 'search', 'look for', 'get', 'need', 'want']
+SEARCH_NOUNS = ['product', 'item', 'thing']
+
+SEARCH_PHRASES = [
+    'i need', 'i want', 'looking for', 'searching for',
+    'show me', 'find me', 'get me'
+]
+
+HELP_PHRASES = ['help', 'what can you do', 'how does this work']
+
+DEFAULT_CATEGORY_KEYWORDS = {
+    'smartphones': ['phone', 'smartphone', 'mobile', 'cell phone', 'iphone', 'android'],
+    'laptops': ['laptop', 'computer', 'notebook', 'macbook', 'pc'],
+    'headphones': ['headphone', 'earphone', 'earbuds', 'headset', 'airpods'],
+    'tablets': ['tablet', 'ipad', 'surface'],
+    'smartwatches': ['watch', 'smartwatch', 'fitness tracker'],
+    'accessories': ['case', 'charger', 'cable', 'adapter', 'stand']
+}
+
+DEFAULT_BRAND_KEYWORDS = [
+    'apple', 'samsung', 'google', 'microsoft', 'sony', 'bose', 'jbl',
+    'dell', 'hp', 'lenovo', 'asus', 'acer', 'huawei', 'xiaomi', 'oneplus'
+]
+
+# Intent precedence used to pick the primary intent
+INTENT_PRIORITY = ['greeting', 'product_search', 'help']
+
+# Plural endings accepted after an entity term ("phones", "watches")
+PLURAL_SUFFIXES = ('s', 'es')
+
+def _trie_pattern(terms):
+    """Build a regex alternation factored by common prefixes, preferring the longest term."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def render(node):
+        terminal = '' in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+    
+    return render(trie)
+
+def _is_word_char(char):
+    """Match the definition of \\w used by re for word boundaries."""
+    return char.isalnum() or char == '_'
+
+class EntityMatcher:
+    """Aho-Corasick automaton that finds every whole-word category and brand mention."""
+    
+    def __init__(self, category_keywords, brand_keywords):
+        self._transitions = [{}]
+        self._failure = [0]
+        self._outputs = [[]]
+        
+        for category, keywords in category_keywords.items():
+            for keyword in keywords:
+                self._add_term(keyword, 'category', category)
+        for brand in brand_keywords:
+            self._add_term(brand, 'brand', brand)
+        
+        self._build_failure_links()
+    
+    def _add_term(self, term, kind, value):
+        """Insert a term into the keyword trie."""
+        term = term.lower().strip()
+        if not term:
+            return
+        
+        state = 0
+        for char in term:
+            next_state = self._transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions[state][char] = next_state
+                self._transitions.append({})
+                self._failure.append(0)
+                self._outputs.append([])
+            state = next_state
+        
+        if (len(term), kind, value) not in self._outputs[state]:
+            self._outputs[state].append((len(term), kind, value))
+    
+    def _build_failure_links(self):
+        """Compute failure links breadth-first, merge suffix outputs and resolve a full transition table."""
+        # With failure links folded into every state's transitions, matching is one dict lookup per character
+        self._delta = [dict(self._transitions[0])] + [None] * (len(self._transitions) - 1)
+        queue = deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            failure = self._failure[state]
+            if state:
+                self._delta[state] = {**self._delta[failure], **self._transitions[state]}
+            
+            for char, next_state in self._transitions[state].items():
+                queue.append(next_state)
+                target = self._delta[failure].get(char, 0) if state else 0
+                self._failure[next_state] = target
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[target]
+    
+    def find(self, message):
+        """Yield (start, end, kind, value) for each whole-word mention in a lowercase message."""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for index, char in enumerate(message):
+            state = delta[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            
+            for length, kind, value in outputs[state]:
+                start = index - length + 1
+                end = index + 1
+                if start > 0 and _is_word_char(message[start - 1]):
+                    continue
+                if not self._ends_word(message, end):
+                    continue
+                yield start, end, kind, value
+    
+    def extract(self, message):
+        """Return every distinct category and brand mentioned, in order of appearance."""
+        entities = {'categories': [], 'brands': []}
+        for start, end, kind, value in self.find(message.lower()):
+            values = entities['categories' if kind == 'category' else 'brands']
+            if value not in values:
+                values.append(value)
+        return entities
+    
+    def _ends_word(self, message, end):
+        """Check that a term ends a word, optionally followed by a plural suffix."""
+        if end == len(message) or not _is_word_char(message[end]):
+            return True
+        for suffix in PLURAL_SUFFIXES:
+            suffix_end = end + len(suffix)
+            if message.startswith(suffix, end) and (
+                suffix_end == len(message) or not _is_word_char(message[suffix_end])
+            ):
+                return True
+        return False
+
+class IntentClassifier:
+    """Classifies a message with one precompiled regex scan plus one entity automaton pass."""
+    
+    def __init__(self, category_keywords=None, brand_keywords=None):
+        if category_keywords is None:
+            category_keywords = DEFAULT_CATEGORY_KEYWORDS
+        if brand_keywords is None:
+            brand_keywords = DEFAULT_BRAND_KEYWORDS
+        
+        # term -> [(kind, value, word_bounded)]
+        features = {}
+        
+        def add(term, kind, value, word_bounded):
+            features.setdefault(term.lower(), []).append((kind, value, word_bounded))
+        
+        for phrase in GREETING_PHRASES:
+            add(phrase, 'greeting', phrase, True)
+        for verb in SEARCH_VERBS:
+            add(verb, 'search_verb', verb, True)
+        for noun in SEARCH_NOUNS:
+            add(noun, 'search_noun', noun, True)
+        for phrase in SEARCH_PHRASES:
+            add(phrase, 'search_phrase', phrase, True)
+        for phrase in HELP_PHRASES:
+            add(phrase, 'help', phrase, False)
+        
+        self.entities = EntityMatcher(category_keywords, brand_keywords)
+        
+        # A lookahead alternation reports one term per start position, so every
+        # term also carries the features of shorter terms that are its prefixes.
+        terms = sorted(features, key=len, reverse=True)
+        self._features = {}
+        for term in terms:
+            self._features[term] = [
+                (kind, value, word_bounded, len(prefix))
+                for prefix in terms if term.startswith(prefix)
+                for kind, value, word_bounded in features[prefix]
+            ]
+        
+        self._pattern = re.compile('(?=(' + _trie_pattern(terms) + '))')
+    
+    def classify(self, message):
+        """Return the primary intent, every matched intent, and category/brand entities."""
+        message = message.lower()
+        matched = {'greeting': False, 'help': False}
+        verb_ends = []
+        noun_starts = []
+        search_phrase = False
+        
+        for match in self._pattern.finditer(message):
+            start = match.start()
+            for kind, value, word_bounded, length in self._features[match.group(1)]:
+                end = start + length
+                if word_bounded and not self._on_word_boundaries(message, start, end):
+                    continue
+                
+                if kind == 'search_verb':
+                    verb_ends.append(end)
+                elif kind == 'search_noun':
+                    noun_starts.append(start)
+                elif kind == 'search_phrase':
+                    search_phrase = True
+                else:
+                    matched[kind] = True
+        
+        entities = self.entities.extract(message)
+        matched['product_search'] = (
+            search_phrase
+            or bool(entities['categories'])
+            or self._verb_before_noun(message, verb_ends, noun_starts)
+        )
+        
+        intents = [intent for intent in INTENT_PRIORITY if matched[intent]]
+        return {
+            'intent': intents[0] if intents else 'default',
+            'intents': intents,
+            'categories': entities['categories'],
+            'brands': entities['brands']
+        }
+    
+    def _on_word_boundaries(self, message, start, end):
+        """Check that message[start:end] is delimited like \\b...\\b."""
+        if start > 0 and _is_word_char(message[start - 1]):
+            return False
+        if end < len(message) and _is_word_char(message[end]):
+            return False
+        return True
+    
+    def _verb_before_noun(self, message, verb_ends, noun_starts):
+        """Check for a search verb followed by a search noun on the same line."""
+        for verb_end in verb_ends:
+            for noun_start in noun_starts:
+                if noun_start >= verb_end and '\n' not in message[verb_end:noun_start]:
+                    return True
+        return False
@@ -0,0 +1,237 @@
+"""
+Request metrics: per-route latency histograms, status counts, in-flight gauges and SQL query timings in Prometheus text format.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the queries-per-request buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Histogram:
+    """Bucketed observations for one label set."""
+    
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        """Add one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def samples(self, name, labels):
+        """Yield cumulative bucket, sum and count sample lines."""
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            yield f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}"
+        yield f"{name}_sum{format_labels(labels)} {self.sum!r}"
+        yield f"{name}_count{format_labels(labels)} {self.count}"
+
+def format_labels(labels):
+    """Render ((name, value), ...) as a Prometheus label set."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+def escape_label(value):
+    """Escape a label value's backslashes, quotes and newlines."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RequestMetrics:
+    """Collects request and SQL metrics for this process and renders them for Prometheus.
+    
+    Routes are labelled by their URL rule (/api/products/<int:product_id>)
+    rather than the raw path, so label cardinality stays bounded. Latency is
+    measured until the response is returned to the server; for streamed
+    responses that is before the body is sent. SQL hooks count every query
+    on the instrumented engines, and attribute them to the request running
+    on the same thread, which is what answers "is this endpoint slow because
+    of SQL". Stage timers break chatbot handling down further. Every worker
+    process keeps its own numbers; Prometheus sums them across scrape
+    targets.
+    """
+    
+    def __init__(self, enabled=True, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._engines = set()
+        self.requests = {}
+        self.latency = {}
+        self.in_flight = {}
+        self.sql_queries = {}
+        self.sql_latency = {}
+        self.stages = {}
+        self.queries_total = 0
+        self.query_seconds_total = 0.0
+        self.started_at = time.time()
+    
+    def init_app(self, app, engine=None):
+        """Time every request of app and, when given, count engine's queries."""
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if engine is not None:
+            self.instrument_engine(engine)
+    
+    def instrument_engine(self, engine):
+        """Count queries and their time through cursor execution hooks."""
+        if not self.enabled or id(engine) in self._engines:
+            return
+        self._engines.add(id(engine))
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+    
+    @contextmanager
+    def stage(self, name):
+        """Time a block of request handling, e.g. with request_metrics.stage('classification'):"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                histogram = self.stages.get(name)
+                if histogram is None:
+                    histogram = self.stages[name] = Histogram(self.buckets)
+                histogram.observe(elapsed)
+    
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            
+            def family(name, kind, description, samples):
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+            
+            family('http_requests_total', 'counter', 'Requests handled, by route, method and status.', (
+                f"http_requests_total{format_labels(labels)} {count}"
+                for labels, count in sorted(self.requests.items())
+            ))
+            family('http_request_duration_seconds', 'histogram', 'Request latency until the response is returned.', (
+                line for labels, histogram in sorted(self.latency.items())
+                for line in histogram.samples('http_request_duration_seconds', labels)
+            ))
+            family('http_requests_in_flight', 'gauge', 'Requests currently being handled.', (
+                f"http_requests_in_flight{format_labels(labels)} {count}"
+                for labels, count in sorted(self.in_flight.items())
+            ))
+            family('http_request_sql_queries', 'histogram', 'SQL queries executed per request.', (
+                line for labels, histogram in sorted(self.sql_queries.items())
+                for line in histogram.samples('http_request_sql_queries', labels)
+            ))
+            family('http_request_sql_duration_seconds', 'histogram', 'Time spent executing SQL per request.', (
+                line for labels, histogram in sorted(self.sql_latency.items())
+                for line in histogram.samples('http_request_sql_duration_seconds', labels)
+            ))
+            family('app_stage_duration_seconds', 'histogram', 'Time spent in request handling stages.', (
+                line for name, histogram in sorted(self.stages.items())
+                for line in histogram.samples('app_stage_duration_seconds', (('stage', name),))
+            ))
+            family('db_queries_total', 'counter', 'SQL queries executed, including background threads.', [
+                f"db_queries_total {self.queries_total}"
+            ])
+            family('db_query_duration_seconds_total', 'counter', 'Time spent executing SQL, including background threads.', [
+                f"db_query_duration_seconds_total {self.query_seconds_total!r}"
+            ])
+            family('process_start_time_seconds', 'gauge', 'Start time of the process since the Unix epoch.', [
+                f"process_start_time_seconds {self.started_at!r}"
+            ])
+            return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Drop all recorded metrics except in-flight gauges."""
+        with self._lock:
+            for values in (self.requests, self.latency, self.sql_queries, self.sql_latency, self.stages):
+                values.clear()
+            self.queries_total = 0
+            self.query_seconds_total = 0.0
+    
+    def _route_labels(self):
+        """(method, route) labels for the current request."""
+        rule = request.url_rule
+        return (('method', request.method), ('route', rule.rule if rule is not None else 'unmatched'))
+    
+    def _before_request(self):
+        labels = self._route_labels()
+        g.metrics_labels = labels
+        g.metrics_sql_queries = 0
+        g.metrics_sql_seconds = 0.0
+        with self._lock:
+            self.in_flight[labels] = self.in_flight.get(labels, 0) + 1
+        g.metrics_start = time.perf_counter()
+    
+    def _after_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        labels = g.metrics_labels
+        status_labels = labels + (('status', str(response.status_code)),)
+        
+        with self._lock:
+            self.requests[status_labels] = self.requests.get(status_labels, 0) + 1
+            for histograms, buckets, value in (
+                (self.latency, self.buckets, elapsed),
+                (self.sql_queries, QUERY_COUNT_BUCKETS, g.metrics_sql_queries),
+                (self.sql_latency, self.buckets, g.metrics_sql_seconds)
+            ):
+                histogram = histograms.get(labels)
+                if histogram is None:
+                    histogram = histograms[labels] = Histogram(buckets)
+                histogram.observe(value)
+        return response
+    
+    def _teardown_request(self, error=None):
+        labels = g.pop('metrics_labels', None)
+        if labels is None:
+            return
+        with self._lock:
+            self.in_flight[labels] -= 1
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+        with self._lock:
+            self.queries_total += 1
+            self.query_seconds_total += elapsed
+        if has_request_context() and 'metrics_labels' in g:
+            g.metrics_sql_queries += 1
+            g.metrics_sql_seconds += elapsed
+    
+    def _handle_error(self, context):
+        # Failed statements never reach after_cursor_execute
+        starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+# Global request metrics; METRICS_ENABLED=false turns off all recording
+request_metrics = RequestMetrics(enabled=os.environ.get('METRICS_ENABLED', 'true').lower() == 'true')
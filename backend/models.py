@@ -2,11 +2,19 @@
 Database models for the E-commerce Chatbot system.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, insert, select, text, Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import QueuePool, StaticPool, NullPool, SingletonThreadPool
 from datetime import datetime
-import bcrypt
+import logging
+import os
+import threading
+from hashing import password_hasher
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -26,11 +34,15 @@ class User(Base):
     
     def set_password(self, password):
         """Hash and set the user's password."""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         """Check if the provided password matches the stored hash."""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.check(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash was made with a different bcrypt cost factor."""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert user object to dictionary."""
@@ -45,6 +57,13 @@ class User(Base):
 class Product(Base):
     """Product model for e-commerce inventory."""
     __tablename__ = 'products'
+    __table_args__ = (
+        Index('ix_products_category_price', 'category', 'price'),
+        Index('ix_products_brand_price', 'brand', 'price'),
+        Index('ix_products_price', 'price'),
+        Index('ix_products_is_featured', 'is_featured'),
+        Index('ix_products_is_on_sale', 'is_on_sale'),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(200), nullable=False)
@@ -86,6 +105,9 @@ class Product(Base):
 class ChatSession(Base):
     """Chat session model to store conversation history."""
     __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        Index('ix_chat_sessions_user_id_updated_at', 'user_id', 'updated_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -98,8 +120,14 @@ class ChatSession(Base):
     user = relationship("User", back_populates="chat_sessions")
     messages = relationship("ChatMessage", back_populates="session")
     
-    def to_dict(self):
-        """Convert chat session object to dictionary."""
+    def to_dict(self, message_count=None):
+        """Convert chat session object to dictionary.
+        
+        Pass a precomputed message_count to avoid loading the messages relationship.
+        """
+        if message_count is None:
+            message_count = len(self.messages) if self.messages else 0
+        
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -107,12 +135,16 @@ class ChatSession(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
-            'message_count': len(self.messages) if self.messages else 0
+            'message_count': message_count
         }
 
 class ChatMessage(Base):
     """Individual chat messages within a session."""
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        Index('ix_chat_messages_session_id_timestamp', 'session_id', 'timestamp'),
+        Index('ix_chat_messages_timestamp', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey('chat_sessions.id'), nullable=False)
@@ -135,13 +167,122 @@ class ChatMessage(Base):
             'metadata': self.message_metadata
         }
 
+class ProductChange(Base):
+    """Change log entry: a product was inserted, updated or deleted, in commit order."""
+    __tablename__ = 'product_changes'
+    __table_args__ = (
+        Index('ix_product_changes_changed_at', 'changed_at'),
+        # Never reuse sequence numbers, even after pruning the newest rows
+        {'sqlite_autoincrement': True}
+    )
+    
+    seq = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # 'upsert' or 'delete'
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+# Product change log written by triggers, so bulk deletes, Core inserts and other processes are logged too
+PRODUCT_CHANGES_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS product_changes_insert AFTER INSERT ON products BEGIN
+        INSERT INTO product_changes(product_id, operation, changed_at) VALUES (new.id, 'upsert', datetime('now'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_changes_delete AFTER DELETE ON products BEGIN
+        INSERT INTO product_changes(product_id, operation, changed_at) VALUES (old.id, 'delete', datetime('now'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_changes_update AFTER UPDATE ON products BEGIN
+        INSERT INTO product_changes(product_id, operation, changed_at)
+        SELECT old.id, 'delete', datetime('now') WHERE old.id != new.id;
+        INSERT INTO product_changes(product_id, operation, changed_at) VALUES (new.id, 'upsert', datetime('now'));
+    END"""
+]
+
+# FTS5 full-text index mirrored from the products table by triggers
+PRODUCT_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, brand, category,
+        content='products', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, brand, category)
+        VALUES (new.id, new.name, new.description, new.brand, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, brand, category)
+        VALUES ('delete', old.id, old.name, old.description, old.brand, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, brand, category)
+        VALUES ('delete', old.id, old.name, old.description, old.brand, old.category);
+        INSERT INTO products_fts(rowid, name, description, brand, category)
+        VALUES (new.id, new.name, new.description, new.brand, new.category);
+    END"""
+]
+
+POOL_CLASSES = {
+    'queue': QueuePool,
+    'static': StaticPool,
+    'null': NullPool,
+    'singleton': SingletonThreadPool
+}
+
 class DatabaseManager:
     """Database management utility class."""
     
-    def __init__(self, database_url='sqlite:///ecommerce_chatbot.db'):
-        self.engine = create_engine(database_url, echo=False)
+    def __init__(self, database_url=None):
+        database_url = database_url or os.environ.get('DATABASE_URL', 'sqlite:///ecommerce_chatbot.db')
+        self.engine = create_engine(database_url, echo=False, **self._engine_options(database_url))
+        
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', self._configure_sqlite_connection)
+        
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        Base.metadata.create_all(bind=self.engine)
+        self.fts_enabled = False
+        self.change_log_triggers = False
+        self.create_tables()
+        
+        # Product change notification for in-process indexes and caches
+        self._product_listeners = []
+        self._local_change_seqs = set()
+        self._local_change_lock = threading.Lock()
+        event.listen(self.SessionLocal, 'after_flush', self._collect_product_changes)
+        event.listen(self.SessionLocal, 'after_commit', self._dispatch_product_changes)
+        event.listen(self.SessionLocal, 'after_rollback', self._discard_product_changes)
+        
+        # User change notification for cached user records
+        self._user_listeners = []
+        event.listen(self.SessionLocal, 'after_flush', self._collect_user_changes)
+        event.listen(self.SessionLocal, 'after_commit', self._dispatch_user_changes)
+        event.listen(self.SessionLocal, 'after_rollback', self._discard_user_changes)
+    
+    def _engine_options(self, database_url):
+        """Build connection pool options from the environment."""
+        options = {'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'}
+        
+        pool_class = os.environ.get('DB_POOL_CLASS', '').lower()
+        if pool_class:
+            if pool_class not in POOL_CLASSES:
+                raise ValueError(f"Unknown DB_POOL_CLASS '{pool_class}', expected one of: {', '.join(POOL_CLASSES)}")
+            options['poolclass'] = POOL_CLASSES[pool_class]
+        
+        # Size limits only apply to QueuePool, the default for file databases
+        url = make_url(database_url)
+        in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+        if pool_class == 'queue' or (not pool_class and not in_memory):
+            options['pool_size'] = int(os.environ.get('DB_POOL_SIZE', 10))
+            options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+            options['pool_timeout'] = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+        
+        return options
+    
+    def _configure_sqlite_connection(self, dbapi_connection, connection_record):
+        """Apply journal, durability and lock-wait pragmas to each new SQLite connection."""
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={os.environ.get('DB_JOURNAL_MODE', 'WAL')}")
+            cursor.execute(f"PRAGMA synchronous={os.environ.get('DB_SYNCHRONOUS', 'NORMAL')}")
+            cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))}")
+        finally:
+            cursor.close()
     
     def get_session(self):
         """Get a database session."""
@@ -154,10 +295,174 @@ class DatabaseManager:
     def create_tables(self):
         """Create all database tables."""
         Base.metadata.create_all(bind=self.engine)
+        self.create_indexes()
+        self.fts_enabled = self._create_search_table()
+        self.change_log_triggers = self._create_change_log_triggers()
+    
+    def create_indexes(self):
+        """Create declared indexes missing from tables that predate them."""
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
     
     def drop_tables(self):
         """Drop all database tables."""
+        if self.fts_enabled:
+            with self.engine.begin() as connection:
+                connection.execute(text('DROP TABLE IF EXISTS products_fts'))
+            self.fts_enabled = False
         Base.metadata.drop_all(bind=self.engine)
+    
+    def _create_change_log_triggers(self):
+        """Create the product_changes triggers; False when the database is not SQLite."""
+        if self.engine.dialect.name != 'sqlite':
+            return False
+        
+        with self.engine.begin() as connection:
+            for statement in PRODUCT_CHANGES_DDL:
+                connection.execute(text(statement))
+        return True
+    
+    def _create_search_table(self):
+        """Create the FTS5 product index and its sync triggers; False when FTS5 is unavailable."""
+        if self.engine.dialect.name != 'sqlite':
+            return False
+        
+        try:
+            with self.engine.begin() as connection:
+                exists = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+                )).first() is not None
+                
+                for statement in PRODUCT_FTS_DDL:
+                    connection.execute(text(statement))
+                
+                # Backfill rows that predate the index
+                if not exists:
+                    connection.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            return True
+        except OperationalError as e:
+            logger.warning("Full-text search unavailable, using basic search: %s", e)
+            return False
+    
+    def add_product_listener(self, listener):
+        """Register a callback invoked as listener(upserted, deleted_ids) after product commits."""
+        self._product_listeners.append(listener)
+    
+    def _collect_product_changes(self, session, flush_context):
+        """Snapshot products written by a flush until the transaction commits."""
+        upserted = {}
+        deleted_ids = set()
+        
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Product) and obj.id is not None and session.is_modified(obj):
+                upserted[obj.id] = obj.to_dict()
+        
+        for obj in session.deleted:
+            if isinstance(obj, Product) and obj.id is not None:
+                deleted_ids.add(obj.id)
+        
+        if not upserted and not deleted_ids:
+            return
+        
+        # Without triggers, log ORM writes to the change feed in the same transaction
+        if not self.change_log_triggers:
+            now = datetime.utcnow()
+            session.connection().execute(insert(ProductChange), [
+                {'product_id': product_id, 'operation': operation, 'changed_at': now}
+                for operation, product_ids in (('delete', sorted(deleted_ids)), ('upsert', sorted(upserted)))
+                for product_id in product_ids
+            ])
+        
+        if self.engine.dialect.name == 'sqlite':
+            self._record_local_changes(session, upserted, deleted_ids)
+        
+        changes = session.info.setdefault('product_changes', {'upserted': {}, 'deleted': set()})
+        for product_id in deleted_ids:
+            changes['upserted'].pop(product_id, None)
+        changes['upserted'].update(upserted)
+        changes['deleted'] |= deleted_ids
+    
+    def _record_local_changes(self, session, upserted, deleted_ids):
+        """Remember the change log sequences a flush wrote, so the change feed can skip them.
+        
+        The transaction holds SQLite's write lock, so this flush's entries are the
+        newest in the log; they are only recorded when they match the flushed writes.
+        """
+        expected = sorted(
+            [(product_id, 'upsert') for product_id in upserted] + [(product_id, 'delete') for product_id in deleted_ids]
+        )
+        rows = session.connection().execute(
+            select(ProductChange.seq, ProductChange.product_id, ProductChange.operation)
+            .order_by(ProductChange.seq.desc()).limit(len(expected))
+        ).all()
+        if sorted((row.product_id, row.operation) for row in rows) != expected:
+            return
+        
+        seqs = [row.seq for row in rows]
+        session.info.setdefault('product_change_seqs', []).extend(seqs)
+        with self._local_change_lock:
+            self._local_change_seqs.update(seqs)
+    
+    def local_changes(self, seqs):
+        """Get which of these change log sequences were committed by this process."""
+        with self._local_change_lock:
+            return self._local_change_seqs.intersection(seqs)
+    
+    def forget_local_changes(self, up_to):
+        """Drop remembered sequences up to and including the change feed's last applied one."""
+        with self._local_change_lock:
+            self._local_change_seqs = {seq for seq in self._local_change_seqs if seq > up_to}
+    
+    def _dispatch_product_changes(self, session):
+        """Notify listeners of the products changed by a committed transaction."""
+        session.info.pop('product_change_seqs', None)
+        changes = session.info.pop('product_changes', None)
+        if not changes:
+            return
+        
+        self.notify_product_changes(list(changes['upserted'].values()), sorted(changes['deleted']))
+    
+    def notify_product_changes(self, upserted, deleted_ids):
+        """Pass product changes to every product listener, e.g. changes replayed from the change feed."""
+        for listener in self._product_listeners:
+            listener(upserted, deleted_ids)
+    
+    def _discard_product_changes(self, session):
+        """Drop pending product changes when the transaction is rolled back."""
+        session.info.pop('product_changes', None)
+        
+        # Rolled-back sequence numbers are reused by the next writer
+        seqs = session.info.pop('product_change_seqs', None)
+        if seqs:
+            with self._local_change_lock:
+                self._local_change_seqs.difference_update(seqs)
+    
+    def add_user_listener(self, listener):
+        """Register a callback invoked as listener(user_ids) after commits that update or delete users."""
+        self._user_listeners.append(listener)
+    
+    def _collect_user_changes(self, session, flush_context):
+        """Remember users updated or deleted by a flush until the transaction commits."""
+        user_ids = {
+            obj.id for obj in list(session.dirty) + list(session.deleted)
+            if isinstance(obj, User) and obj.id is not None
+        }
+        if user_ids:
+            session.info.setdefault('user_changes', set()).update(user_ids)
+    
+    def _dispatch_user_changes(self, session):
+        """Notify listeners of the users changed by a committed transaction."""
+        user_ids = session.info.pop('user_changes', None)
+        if not user_ids:
+            return
+        
+        for listener in self._user_listeners:
+            listener(sorted(user_ids))
+    
+    def _discard_user_changes(self, session):
+        """Drop pending user changes when the transaction is rolled back."""
+        session.info.pop('user_changes', None)
 
 # Global database manager instance
 db_manager = DatabaseManager() 
\ No newline at end of file
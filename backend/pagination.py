@@ -0,0 +1,54 @@
+"""
+Opaque cursors and row counting for keyset-paginated endpoints.
+"""
+
+import base64
+import binascii
+import json
+import math
+from sqlalchemy import func
+
+# Approximate totals stop counting after this many rows
+APPROXIMATE_COUNT_CAP = 1000
+
+def encode_cursor(position):
+    """Encode a keyset position (a JSON-serializable dict) as an opaque URL-safe cursor."""
+    payload = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, **fields):
+    """Decode a cursor created by encode_cursor, checking it carries the expected fields.
+    
+    Each keyword maps a field name to the type, or tuple of types, its value must have;
+    booleans never pass for numbers, nor NaN or infinity for floats.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    
+    if not isinstance(position, dict):
+        raise ValueError('Invalid cursor')
+    for field, types in fields.items():
+        value = position.get(field)
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError('Invalid cursor')
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError('Invalid cursor')
+    return position
+
+def count_rows(query, exact=False):
+    """Count the rows a query returns; unless exact, stop after APPROXIMATE_COUNT_CAP rows.
+    
+    Returns (count, is_exact).
+    """
+    query = query.order_by(None)
+    if exact:
+        return query.count(), True
+    
+    capped = query.limit(APPROXIMATE_COUNT_CAP + 1).subquery()
+    count = query.session.query(func.count()).select_from(capped).scalar()
+    if count > APPROXIMATE_COUNT_CAP:
+        return APPROXIMATE_COUNT_CAP, False
+    return count, True
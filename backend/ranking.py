@@ -0,0 +1,89 @@
+"""
+Vectorized ranking of product search candidates over a catalog snapshot.
+"""
+
+import numpy as np
+
+# Weight of each normalized (0-1) ranking feature
+DEFAULT_RANKING_WEIGHTS = {
+    'relevance': 4.0,   # Share of the search keywords the product matches
+    'rating': 1.0,      # Rating out of 5
+    'price': 0.5,       # Cheapest candidate 1, most expensive 0
+    'stock': 0.5,       # Stock level, saturating at STOCK_SATURATION units
+    'on_sale': 0.5,
+    'featured': 0.25
+}
+
+# Stock level beyond which more units add nothing to the score
+STOCK_SATURATION = 50
+
+def parse_weights(value):
+    """Parse "relevance=4,price=1" into ranking weights over the defaults."""
+    weights = dict(DEFAULT_RANKING_WEIGHTS)
+    if not value:
+        return weights
+    
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"Unknown ranking weight: {name}")
+        weights[name] = float(weight)
+    return weights
+
+class ProductRanker:
+    """Scores candidate products as a weighted sum of features in one pass over column arrays."""
+    
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_RANKING_WEIGHTS)
+        self.weights.update(weights or {})
+    
+    def scores(self, snapshot, positions, relevance=None):
+        """Score the products at snapshot positions; relevance is aligned with positions."""
+        weights = self.weights
+        scores = np.zeros(len(positions), dtype=np.float64)
+        if not len(positions):
+            return scores
+        
+        if relevance is not None and weights['relevance']:
+            scores += weights['relevance'] * relevance
+        
+        if weights['rating']:
+            scores += weights['rating'] * (snapshot.rating[positions] / 5.0)
+        
+        if weights['price']:
+            prices = snapshot.display_price[positions]
+            low, high = prices.min(), prices.max()
+            if high > low:
+                scores += weights['price'] * ((high - prices) / (high - low))
+        
+        if weights['stock']:
+            scores += weights['stock'] * (np.minimum(snapshot.stock[positions], STOCK_SATURATION) / STOCK_SATURATION)
+        
+        if weights['on_sale']:
+            scores += weights['on_sale'] * snapshot.is_on_sale[positions]
+        
+        if weights['featured']:
+            scores += weights['featured'] * snapshot.is_featured[positions]
+        
+        return scores
+    
+    def top_k(self, snapshot, positions, k, relevance=None):
+        """Get the positions of the k best-scoring products, best first, ties broken by id."""
+        scores = self.scores(snapshot, positions, relevance)
+        
+        if len(positions) > k:
+            # Everything above the k-th best score wins; the lowest ids fill the rest from its ties
+            threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            above = np.flatnonzero(scores > threshold)
+            tied = np.flatnonzero(scores == threshold)
+            needed = k - len(above)
+            if len(tied) > needed:
+                tied = tied[np.argpartition(snapshot.ids[positions[tied]], needed - 1)[:needed]]
+            best = np.concatenate([above, tied])
+        else:
+            best = np.arange(len(positions))
+        
+        # Order the k winners by score, then by product id for stable results
+        order = np.lexsort((snapshot.ids[positions[best]], -scores[best]))
+        return positions[best[order]]
@@ -0,0 +1,217 @@
+"""
+Product search: in-memory inverted index for the chatbot and FTS5 full-text search for the API.
+"""
+
+import logging
+import re
+import threading
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import Product, db_manager
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens."""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+def singular_forms(token):
+    """The token plus its likely singulars ("phones" -> "phone", "watches" -> "watch", "accessories" -> "accessory")."""
+    forms = {token}
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        forms.add(token[:-1])
+        if token.endswith('ies'):
+            forms.add(token[:-3] + 'y')
+        elif token.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+            forms.add(token[:-2])
+    return forms
+
+class ProductSearchIndex:
+    """Tokenized inverted index over product name, description, brand and category."""
+    
+    INDEXED_FIELDS = ('name', 'description', 'brand', 'category')
+    
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._product_tokens = {}
+        self._vocabulary = []
+        self._vocabulary_text = ''
+        self._vocabulary_offsets = []
+        self._vocabulary_stale = False
+        self._lock = threading.RLock()
+        self.is_built = False
+    
+    def build(self, db_session=None):
+        """(Re)build the index from the products table."""
+        session = db_session or db_manager.get_session()
+        try:
+            rows = session.query(
+                Product.id, Product.name, Product.description, Product.brand, Product.category
+            ).all()
+        finally:
+            if db_session is None:
+                db_manager.close_session(session)
+        
+        with self._lock:
+            self._postings = defaultdict(set)
+            self._product_tokens = {}
+            for product_id, name, description, brand, category in rows:
+                self._add(product_id, {
+                    'name': name,
+                    'description': description,
+                    'brand': brand,
+                    'category': category
+                })
+            self._vocabulary_stale = True
+            self.is_built = True
+    
+    def ensure_built(self):
+        """Build the index on first use."""
+        if not self.is_built:
+            with self._lock:
+                if not self.is_built:
+                    self.build()
+    
+    def apply_changes(self, upserted, deleted_ids):
+        """Apply committed product changes (see DatabaseManager.add_product_listener)."""
+        with self._lock:
+            if not self.is_built:
+                return
+            for product_id in deleted_ids:
+                self._remove(product_id)
+            for product in upserted:
+                self._remove(product['id'])
+                self._add(product['id'], product)
+            self._vocabulary_stale = True
+    
+    def has_token(self, token):
+        """Whether any product's name, description, brand or category contains the token."""
+        self.ensure_built()
+        with self._lock:
+            return token in self._postings
+    
+    def keyword_matches(self, keywords):
+        """Count how many of the keywords each product matches; returns {product_id: count}."""
+        self.ensure_built()
+        
+        counts = Counter()
+        with self._lock:
+            for keyword in keywords:
+                ids = set()
+                for token in tokenize(keyword):
+                    ids |= self._lookup(token)
+                counts.update(ids)
+        return counts
+    
+    def _lookup(self, token):
+        """Get ids of products with a token containing the given token or one of its singulars.
+        
+        Substring matching, like a LIKE '%phone%' filter, lets "phone" find
+        "iphone" and "smartphones". The sorted vocabulary is kept as one
+        newline-joined string, so each form is a few str.find calls rather
+        than a loop over every term.
+        """
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_text = '\n'.join(self._vocabulary)
+            self._vocabulary_offsets = []
+            offset = 0
+            for term in self._vocabulary:
+                self._vocabulary_offsets.append(offset)
+                offset += len(term) + 1
+            self._vocabulary_stale = False
+        
+        terms = set()
+        for form in singular_forms(token):
+            position = self._vocabulary_text.find(form)
+            while position != -1:
+                index = bisect_right(self._vocabulary_offsets, position) - 1
+                terms.add(index)
+                # Continue after this term; later matches inside it add nothing
+                next_term = index + 1
+                if next_term >= len(self._vocabulary_offsets):
+                    break
+                position = self._vocabulary_text.find(form, self._vocabulary_offsets[next_term])
+        
+        ids = set()
+        for index in terms:
+            ids.update(self._postings.get(self._vocabulary[index], ()))
+        return ids
+    
+    def _add(self, product_id, product):
+        """Index a single product record."""
+        tokens = set()
+        for field in self.INDEXED_FIELDS:
+            tokens.update(tokenize(product.get(field)))
+        
+        for token in tokens:
+            self._postings[token].add(product_id)
+        self._product_tokens[product_id] = tokens
+    
+    def _remove(self, product_id):
+        """Drop a product from the index."""
+        for token in self._product_tokens.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(product_id)
+            if not postings:
+                del self._postings[token]
+
+# BM25 column weights for name, description, brand and category
+FTS_COLUMN_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+FTS_SEARCH_SQL = text(f"""
+    SELECT rowid,
+           bm25(products_fts, {', '.join(str(weight) for weight in FTS_COLUMN_WEIGHTS)}) AS score,
+           snippet(products_fts, 1, '<mark>', '</mark>', '...', 12) AS snippet
+    FROM products_fts
+    WHERE products_fts MATCH :match
+    ORDER BY score
+    LIMIT :limit
+""")
+
+def build_fts_query(query_text):
+    """Turn free text into an FTS5 query of quoted prefix terms, or None if it has no terms."""
+    tokens = tokenize(query_text)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def full_text_search(db_session, query_text, limit=20, columns=None):
+    """Rank products with FTS5/BM25; returns (product, score, snippet) tuples, or None if unavailable.
+    
+    With columns (which must include Product.id), each product is a row of
+    those columns instead of a Product entity.
+    """
+    match = build_fts_query(query_text)
+    if not db_manager.fts_enabled or match is None:
+        return None
+    
+    try:
+        rows = db_session.execute(FTS_SEARCH_SQL, {'match': match, 'limit': limit}).all()
+    except OperationalError as e:
+        logger.warning("Full-text search failed, using basic search: %s", e)
+        return None
+    
+    if not rows:
+        return []
+    
+    products = db_session.query(*(columns or [Product])).filter(Product.id.in_([row.rowid for row in rows])).all()
+    products_by_id = {product.id: product for product in products}
+    
+    # bm25() is lower-is-better; report it as a positive relevance score
+    return [
+        (products_by_id[row.rowid], round(-row.score, 4), row.snippet)
+        for row in rows if row.rowid in products_by_id
+    ]
+
+# Global product search index, kept current by committed product changes
+product_index = ProductSearchIndex()
+db_manager.add_product_listener(product_index.apply_changes)
@@ -0,0 +1,120 @@
+"""
+Fast JSON encoding and column-tuple product serialization for list endpoints.
+"""
+
+from functools import lru_cache
+from flask.json.provider import DefaultJSONProvider
+from models import Product
+from metrics import request_metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Product fields in Product.to_dict order
+PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'category', 'brand', 'stock_quantity', 'image_url',
+    'rating', 'is_featured', 'is_on_sale', 'sale_price', 'display_price', 'created_at'
+)
+
+# Columns each derived field is computed from; other fields map to their own column
+DERIVED_FIELD_COLUMNS = {
+    'display_price': ('price', 'is_on_sale', 'sale_price')
+}
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed."""
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string."""
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+    
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as a JSON response, like jsonify."""
+        with request_metrics.stage('serialization'):
+            if orjson is None:
+                return super().response(*args, **kwargs)
+            
+            obj = self._prepare_response_obj(args, kwargs)
+            options = self._options() | orjson.OPT_APPEND_NEWLINE
+            if (self.compact is None and self._app.debug) or self.compact is False:
+                options |= orjson.OPT_INDENT_2
+            return self._app.response_class(
+                orjson.dumps(obj, default=self.default, option=options), mimetype=self.mimetype
+            )
+    
+    def _options(self):
+        """orjson options matching the stdlib provider's key handling."""
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+def parse_fields(value):
+    """Parse a ?fields= sparse fieldset into a tuple of product fields; None or empty means all."""
+    if not value:
+        return PRODUCT_FIELDS
+    
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown product field(s): {', '.join(unknown)}")
+    return fields or PRODUCT_FIELDS
+
+class ProductSerializer:
+    """Builds product dictionaries for a field set from rows of selected columns.
+    
+    Query with session.query(*serializer.columns) instead of full Product
+    entities; extra_columns are selected too (e.g. keyset cursor columns)
+    without being output, and can be read back with value().
+    """
+    
+    def __init__(self, fields=PRODUCT_FIELDS, extra_columns=()):
+        self.fields = tuple(fields)
+        
+        names = []
+        for name in self.fields + tuple(extra_columns):
+            for column_name in DERIVED_FIELD_COLUMNS.get(name, (name,)):
+                if column_name not in names:
+                    names.append(column_name)
+        self._positions = {name: position for position, name in enumerate(names)}
+        self.columns = [getattr(Product, name) for name in names]
+        
+        self._plain = [
+            (field, self._positions[field]) for field in self.fields
+            if field not in DERIVED_FIELD_COLUMNS and field != 'created_at'
+        ]
+        self._created_at = self._positions['created_at'] if 'created_at' in self.fields else None
+        self._display_price = None
+        if 'display_price' in self.fields:
+            self._display_price = tuple(self._positions[name] for name in DERIVED_FIELD_COLUMNS['display_price'])
+    
+    def to_dict(self, row):
+        """Convert one row of selected columns to a product dictionary."""
+        data = {field: row[position] for field, position in self._plain}
+        
+        if self._display_price is not None:
+            price, is_on_sale, sale_price = (row[position] for position in self._display_price)
+            data['display_price'] = sale_price if is_on_sale and sale_price else price
+        
+        if self._created_at is not None:
+            created_at = row[self._created_at]
+            data['created_at'] = created_at.isoformat() if created_at else None
+        
+        return data
+    
+    def to_dicts(self, rows):
+        """Convert rows of selected columns to product dictionaries."""
+        return [self.to_dict(row) for row in rows]
+    
+    def value(self, row, name):
+        """Read a selected column from a row."""
+        return row[self._positions[name]]
+
+@lru_cache(maxsize=128)
+def product_serializer(fields=PRODUCT_FIELDS, extra_columns=()):
+    """Get the (cached) ProductSerializer for a field set."""
+    return ProductSerializer(fields, extra_columns)
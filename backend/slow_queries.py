@@ -0,0 +1,225 @@
+"""
+Slow-query log: records statements over a time threshold with redacted parameters and their SQLite query plan.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueListener, RotatingFileHandler
+from sqlalchemy import event
+from structured_logging import DroppingQueueHandler, JSONFormatter, RequestIdFilter
+
+# Plan steps that read a whole table rather than seeking through an index
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+# Literals and parameter lists folded away when fingerprinting a statement
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+def fingerprint(statement):
+    """Normalize a statement so executions differing only in values or IN-list length group together."""
+    normalized = STRING_LITERAL.sub('?', statement)
+    normalized = NUMBER_LITERAL.sub('?', normalized)
+    normalized = WHITESPACE.sub(' ', normalized).strip()
+    normalized = PARAMETER_LIST.sub('(?+)', normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+def full_scans(plan):
+    """Tables a query plan reads in full; scans of subqueries and CTEs are not counted."""
+    subqueries = {step.split()[-1] for step in plan if step.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    return sorted({
+        match.group(1) for match in map(FULL_SCAN.match, plan)
+        if match and match.group(1) not in subqueries
+    })
+
+def redact(parameters):
+    """Replace bound values with their type (and length for strings and bytes)."""
+    if isinstance(parameters, dict):
+        return {name: redact_value(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_value(value) for value in parameters]
+    return redact_value(parameters)
+
+def redact_value(value):
+    """Type placeholder for one bound value."""
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+class SlowQueryLog:
+    """Captures statements slower than threshold_ms on instrumented engines.
+    
+    Each slow execution is written as a JSON line to a rotating file by a
+    background thread (through the same queue handler as application
+    logs), with the statement, redacted parameters, duration and request id.
+    On SQLite the statement's EXPLAIN QUERY PLAN is captured too, at most
+    once per explain_interval seconds per fingerprint, through the DBAPI
+    connection so it does not re-enter these hooks. Executions are also
+    aggregated by fingerprint for summary(); plans with full table scans
+    are flagged. Durations cover statement execution, not fetching rows.
+    """
+    
+    def __init__(self, threshold_ms=0, path='slow_queries.log', max_bytes=10 * 1024 * 1024, backups=5,
+                 explain=True, explain_interval=60, max_fingerprints=500):
+        self.threshold = threshold_ms / 1000.0
+        self.enabled = threshold_ms > 0
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.max_fingerprints = max_fingerprints
+        self.statements = {}
+        self.untracked = 0
+        self._lock = threading.Lock()
+        self._engines = []
+        self._logger = None
+        self._handler = None
+        self._listener = None
+        self._listener_handlers = []
+    
+    def instrument_engine(self, engine):
+        """Time engine's statements; does nothing while disabled."""
+        if not self.enabled or engine in self._engines:
+            return
+        if self._listener is None:
+            self._start_writer()
+        self._engines.append(engine)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+    
+    def close(self):
+        """Stop timing statements and flush the log file."""
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.remove(engine, 'handle_error', self._handle_error)
+        self._engines = []
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+            self._logger.removeHandler(self._handler)
+            for handler in self._listener_handlers:
+                handler.close()
+            self._listener_handlers = []
+    
+    def summary(self, limit=20):
+        """Slow statements grouped by fingerprint, most total time first."""
+        with self._lock:
+            statements = sorted(self.statements.values(), key=lambda entry: entry['total_ms'], reverse=True)
+            return {
+                'threshold_ms': self.threshold * 1000,
+                'fingerprints': len(self.statements),
+                'untracked_executions': self.untracked,
+                'statements': [self._summarize(entry) for entry in statements[:limit]]
+            }
+    
+    def reset(self):
+        """Forget aggregated statements."""
+        with self._lock:
+            self.statements.clear()
+            self.untracked = 0
+    
+    def _summarize(self, entry):
+        summary = {name: value for name, value in entry.items() if name != 'explained_at'}
+        summary['total_ms'] = round(entry['total_ms'], 3)
+        summary['mean_ms'] = round(entry['total_ms'] / entry['count'], 3)
+        return summary
+    
+    def _start_writer(self):
+        output = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8')
+        output.setFormatter(JSONFormatter())
+        self._listener_handlers = [output]
+        
+        self._handler = DroppingQueueHandler(queue.Queue(10000))
+        self._handler.addFilter(RequestIdFilter())
+        self._logger = logging.getLogger('slow_queries')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(self._handler)
+        
+        self._listener = QueueListener(self._handler.queue, output)
+        self._listener.start()
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['slow_query_start'].pop()
+        if elapsed < self.threshold:
+            return
+        
+        key, normalized = fingerprint(statement)
+        duration_ms = elapsed * 1000
+        now = time.monotonic()
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                if len(self.statements) >= self.max_fingerprints:
+                    self.untracked += 1
+                else:
+                    entry = self.statements[key] = {
+                        'fingerprint': key, 'statement': normalized, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                        'last_seen': None, 'plan': None, 'full_scans': [], 'explained_at': None
+                    }
+            if entry is not None:
+                entry['count'] += 1
+                entry['total_ms'] += duration_ms
+                entry['max_ms'] = round(max(entry['max_ms'], duration_ms), 3)
+                entry['last_seen'] = datetime.utcnow().isoformat()
+                explain = entry['explained_at'] is None or now - entry['explained_at'] >= self.explain_interval
+                if explain:
+                    entry['explained_at'] = now
+            else:
+                explain = False
+        
+        plan = self._explain(conn, cursor, statement, parameters) if explain and not executemany else None
+        if plan is not None and entry is not None:
+            with self._lock:
+                entry['plan'] = plan
+                entry['full_scans'] = full_scans(plan)
+        
+        self._logger.warning("Slow query (%.1f ms)", duration_ms, extra={
+            'fingerprint': key,
+            'duration_ms': round(duration_ms, 3),
+            'statement': statement,
+            'parameters': redact(parameters[0] if executemany and parameters else parameters),
+            'executemany_rows': len(parameters) if executemany else None,
+            'plan': plan if plan is not None else (entry['plan'] if entry is not None else None)
+        })
+    
+    def _handle_error(self, context):
+        # Failed statements never reach after_cursor_execute
+        starts = context.connection.info.get('slow_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+    
+    def _explain(self, conn, cursor, statement, parameters):
+        """EXPLAIN QUERY PLAN detail lines for statement, or None when unavailable."""
+        if not self.explain or conn.dialect.name != 'sqlite':
+            return None
+        try:
+            # Straight through the sqlite3 connection: no events, and the statement is not run
+            rows = cursor.connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+        except Exception:
+            return None
+        return [row[3] for row in rows]
+
+# Global slow-query log; off unless SLOW_QUERY_MS is set above zero
+slow_query_log = SlowQueryLog(
+    threshold_ms=float(os.environ.get('SLOW_QUERY_MS', 0)),
+    path=os.environ.get('SLOW_QUERY_LOG_PATH', 'slow_queries.log'),
+    max_bytes=int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+    backups=int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5)),
+    explain=os.environ.get('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+)
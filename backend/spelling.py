@@ -0,0 +1,159 @@
+"""
+Typo-tolerant vocabulary lookup using a SymSpell-style deletion index.
+"""
+
+import re
+import threading
+from collections import Counter, defaultdict
+from fuzzywuzzy import fuzz
+
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9']*")
+
+# Everyday English words that are never misspelled catalog terms ("deal" is not "dell")
+COMMON_WORDS = frozenset('''
+    about above after again against all also always am another any anything are around ask at away back bad
+    be because been before being best better between big bit both bring but buy by call came can cannot care
+    case change cheap check choose clean close come compare could cool cost course cover day deal dear did
+    different do does doing done down each easy else end enough even every everything except fast feel few
+    find fine first fit for found free friend from full gave get gift give given go going gone good got great
+    had half hand happy hard has have having he hear help her here high him his hold home hope hot how idea
+    if in into is it its just keep kind know large last late least less let life light like likes line little
+    live long look looking lot love low made make many may maybe me mean might mind mine more most much must
+    my need never new next nice night no none not nothing now of off offer often old on once one only open or
+    other our out over own part people pick place plan play please plus price quite rather read ready real
+    really recommend right said same save say see seem seen sell send set she should show similar simple
+    since small so some something soon sort start still stuff such suggest sure take tell than thank thanks
+    that the their them then there these they thing things think this those though through time to today too
+    top try under until up upon us use used very want wants was way we well went were what when where which
+    while who whole why will wish with within without word words work works worth would year yes yet you your
+'''.split())
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (edits plus adjacent transpositions), or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+def deletions(word, distance):
+    """Get every string reachable by deleting up to distance characters from word."""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+        results |= frontier
+    return results
+
+class SpellingCorrector:
+    """Maps misspelled words to the closest vocabulary term.
+    
+    Each term is indexed under every string reachable by deleting up to its
+    allowed edit distance, so a lookup only expands the deletions of the
+    input word and verifies the handful of terms sharing one. Lookup cost
+    depends on word length, not vocabulary size. Words shorter than
+    min_length are never corrected, candidates must share the first letter
+    (typos rarely hit it, while real words often differ only there, like
+    "word" and "nord") and be at least min_similarity fuzz.ratio alike.
+    """
+    
+    def __init__(self, min_length=5, long_length=9, min_similarity=75):
+        self.min_length = min_length
+        self.long_length = long_length
+        self.min_similarity = min_similarity
+        self._terms = Counter()
+        self._deletions = defaultdict(set)
+        self._lock = threading.RLock()
+    
+    def max_distance(self, word):
+        """Edits tolerated for a word: none when short, one, or two for long words."""
+        if len(word) < self.min_length:
+            return 0
+        return 1 if len(word) < self.long_length else 2
+    
+    def add(self, term, count=1):
+        """Add a lowercase term, or raise its frequency if already known."""
+        with self._lock:
+            if term not in self._terms:
+                for key in deletions(term, self.max_distance(term)):
+                    self._deletions[key].add(term)
+            self._terms[term] += count
+    
+    def add_text(self, text):
+        """Add every word of a phrase or product name."""
+        for word in WORD_PATTERN.findall((text or '').lower()):
+            self.add(word)
+    
+    def _is_known(self, word):
+        """Whether a word or its singular ("phones", "watches") is in the vocabulary."""
+        return (
+            word in self._terms
+            or (word.endswith('s') and word[:-1] in self._terms)
+            or (word.endswith('es') and word[:-2] in self._terms)
+        )
+    
+    def __contains__(self, word):
+        return word in self._terms
+    
+    def __len__(self):
+        return len(self._terms)
+    
+    def lookup(self, word):
+        """Get the closest term within the allowed edit distance, or None."""
+        distance = self.max_distance(word)
+        if distance == 0:
+            return None
+        
+        with self._lock:
+            candidates = set()
+            for key in deletions(word, distance):
+                candidates.update(self._deletions.get(key, ()))
+            
+            best, best_rank = None, None
+            for term in candidates:
+                if term[0] != word[0]:
+                    continue
+                allowed = min(distance, self.max_distance(term))
+                term_distance = edit_distance(word, term, allowed)
+                if term_distance > allowed:
+                    continue
+                similarity = fuzz.ratio(word, term)
+                if similarity < self.min_similarity:
+                    continue
+                # Closest first, then most similar, then most frequent
+                rank = (term_distance, -similarity, -self._terms[term], term)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = term, rank
+            return best
+    
+    def correct(self, text, is_known=None):
+        """Replace unknown words in lowercase text with their closest terms.
+        
+        Words in the vocabulary, or for which is_known(word) is true, are left
+        alone. Returns (corrected_text, {original: correction}).
+        """
+        corrections = {}
+        
+        def replace(match):
+            word = match.group(0)
+            if self._is_known(word) or (is_known is not None and is_known(word)):
+                return word
+            correction = self.lookup(word)
+            if correction is None or correction == word:
+                return word
+            corrections[word] = correction
+            return correction
+        
+        corrected = WORD_PATTERN.sub(replace, text)
+        return corrected, corrections
@@ -0,0 +1,160 @@
+"""
+Structured logging: JSON log records with request ids, written to stdout by a background thread.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+# Attributes every LogRecord has; anything else came from extra= and is logged as a field
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+# Incoming X-Request-ID values accepted as-is; others are replaced with a fresh id
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+    
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'request_id', '-') != '-':
+            entry['request_id'] = record.request_id
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the id of the Flask request being handled, if any."""
+    
+    def filter(self, record):
+        record.request_id = (g.get('request_id') if has_request_context() else None) or '-'
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    """Queues records for the listener thread, dropping them instead of blocking when the queue is full."""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+    
+    def prepare(self, record):
+        # Merge the message arguments and render tracebacks on the calling
+        # thread, where they are still valid, but leave the layout to the
+        # listener's formatter
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+class StructuredLogging:
+    """Routes the standard logging module through a queue to a single writer thread.
+    
+    Log calls on request threads only check the level, stamp the request id
+    and enqueue the record; formatting and the blocking write to stdout
+    happen on the QueueListener thread. Records below the level are never
+    created, so %-style arguments are not formatted at all. When the writer
+    falls queue_size records behind, new records are dropped and counted
+    rather than stalling requests.
+    """
+    
+    def __init__(self, level='INFO', fmt='json', queue_size=10000):
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        self.fmt = fmt
+        self.queue_size = queue_size
+        self.handler = None
+        self.listener = None
+        self._lock = threading.Lock()
+    
+    def configure(self, stream=None):
+        """Install the queue handler on the root logger and start the writer thread; safe to call again."""
+        with self._lock:
+            if self.listener is not None:
+                return
+            
+            output = logging.StreamHandler(stream or sys.stdout)
+            output.setFormatter(JSONFormatter() if self.fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+            
+            log_queue = queue.Queue(self.queue_size)
+            self.handler = DroppingQueueHandler(log_queue)
+            self.handler.addFilter(RequestIdFilter())
+            
+            root = logging.getLogger()
+            root.handlers = [self.handler]
+            root.setLevel(self.level)
+            
+            self.listener = QueueListener(log_queue, output)
+            self.listener.start()
+            atexit.register(self.stop)
+    
+    def init_app(self, app):
+        """Configure logging and give every request of app an id, returned as X-Request-ID."""
+        self.configure()
+        app.before_request(self._assign_request_id)
+        app.after_request(self._add_request_id_header)
+    
+    def stop(self):
+        """Write out queued records and stop the writer thread."""
+        with self._lock:
+            if self.listener is None:
+                return
+            self.listener.stop()
+            self.listener = None
+            logging.getLogger().removeHandler(self.handler)
+    
+    def stats(self):
+        """Get the configured level and queue counters."""
+        return {
+            'level': logging.getLevelName(self.level),
+            'queued': self.handler.queue.qsize() if self.handler else 0,
+            'dropped': self.handler.dropped if self.handler else 0
+        }
+    
+    def _assign_request_id(self):
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    
+    def _add_request_id_header(self, response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
+
+# Global logging setup; LOG_LEVEL=DEBUG shows per-request debug records, LOG_FORMAT=text for plain lines
+structured_logging = StructuredLogging(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    fmt=os.environ.get('LOG_FORMAT', 'json'),
+    queue_size=int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+)
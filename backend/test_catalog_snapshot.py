@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Check that product reads served from the in-memory catalog snapshot match the SQL read paths
+"""
+
+from testing import run_tests, seed_products
+from models import db_manager, Product
+
+seed_products()
+
+import app as app_module
+from app import app
+from catalog import CatalogSnapshot, CatalogVersion, SNAPSHOT_COLUMNS, catalog_version, product_catalog
+from change_feed import change_feed
+from pagination import encode_cursor
+from sqlalchemy import text
+
+def get_json(path, snapshot_reads):
+    """Call an endpoint with snapshot reads on or off and return its JSON."""
+    previous = app_module.CATALOG_SNAPSHOT_READS
+    app_module.CATALOG_SNAPSHOT_READS = snapshot_reads
+    try:
+        response = app.test_client().get(path)
+        assert response.status_code == 200, f"{path} returned {response.status_code}"
+        payload = response.get_json()
+    finally:
+        app_module.CATALOG_SNAPSHOT_READS = previous
+    payload.pop('total_count_exact', None)
+    return payload
+
+def test_catalog_snapshot_matches_sql():
+    for path in ('/api/products?category=laptops&max_price=2000', '/api/products?brand=apple&limit=2',
+                 '/api/products?on_sale=true&fields=id,name,display_price', '/api/products/1'):
+        assert get_json(path, snapshot_reads=True) == get_json(path, snapshot_reads=False), path
+
+def test_cursor_pages_match_sql():
+    for query in ('limit=4', 'brand=apple&limit=2', 'min_price=100&max_price=900&on_sale=false&limit=3'):
+        pages = {}
+        for snapshot_reads in (True, False):
+            path, ids = f'/api/products?{query}', []
+            while path:
+                payload = get_json(path, snapshot_reads)
+                ids.extend(product['id'] for product in payload['products'])
+                path = payload['next_cursor'] and f"/api/products?{query}&cursor={payload['next_cursor']}"
+            pages[snapshot_reads] = ids
+        assert pages[True] == pages[False], query
+        assert get_json(f'/api/products?{query}&offset=3', True) == get_json(f'/api/products?{query}&offset=3', False)
+
+def test_incremental_changes_match_rebuild():
+    snapshot = product_catalog.snapshot()
+    snapshot.price_order
+    products = [snapshot.product(position) for position in range(len(snapshot))]
+    
+    repriced = dict(products[0], price=products[-1]['price'] + 1)
+    renamed = dict(products[1], name='Renamed', description=None)
+    inserted = [dict(products[2], id=0), dict(products[2], id=int(snapshot.ids[-1]) + 1)]
+    deleted = [products[3]['id']]
+    changed = snapshot.with_changes([repriced, renamed] + inserted, deleted)
+    
+    expected = {product['id']: product for product in products}
+    expected.update({product['id']: product for product in [repriced, renamed] + inserted})
+    del expected[deleted[0]]
+    rebuilt = CatalogSnapshot.from_rows([
+        tuple(product.get(column.key) for column in SNAPSHOT_COLUMNS) for product in expected.values()
+    ], changed.categories, changed.brands)
+    
+    assert [changed.product(position) for position in range(len(changed))] == \
+        [rebuilt.product(position) for position in range(len(rebuilt))]
+    assert changed.price_order.tolist() == rebuilt.price_order.tolist()
+    
+    # A price change leaves the packed text columns shared
+    repriced_only = snapshot.with_changes([repriced], [])
+    assert repriced_only.names is snapshot.names and repriced_only.descriptions is snapshot.descriptions
+
+def test_invalid_pages_are_rejected():
+    paths = ['/api/products?limit=0', '/api/products?limit=-5', '/api/products?offset=-1']
+    for position in ({'price': 'cheap', 'id': 1}, {'price': True, 'id': 1}, {'price': 10.5, 'id': '1'}, {'price': 10.5, 'id': 1.5}):
+        paths.append(f'/api/products?cursor={encode_cursor(position)}')
+    
+    for snapshot_reads in (True, False):
+        previous = app_module.CATALOG_SNAPSHOT_READS
+        app_module.CATALOG_SNAPSHOT_READS = snapshot_reads
+        try:
+            for path in paths:
+                assert app.test_client().get(path).status_code == 400, (path, snapshot_reads)
+        finally:
+            app_module.CATALOG_SNAPSHOT_READS = previous
+
+def test_flag_filters_parse_false():
+    client = app.test_client()
+    products = get_json('/api/products?on_sale=false&limit=500', snapshot_reads=True)['products']
+    assert products and not any(product['is_on_sale'] for product in products)
+    assert get_json('/api/products?on_sale=0&limit=500', snapshot_reads=False)['products'] == products
+    
+    not_on_sale = client.get('/api/products/facets?on_sale=false').get_json()
+    assert client.get('/api/products/facets?on_sale=0').get_json() == not_on_sale
+    assert client.get('/api/products/facets?on_sale=true').get_json() != not_on_sale
+    for path in ('/api/products/facets?featured=yes', '/api/products?on_sale=maybe'):
+        assert client.get(path).status_code == 400, path
+
+def test_version_bumps_after_catalog_updates():
+    # Every other product listener must have applied a change before the ETag moves
+    assert db_manager._product_listeners[-1] == catalog_version.bump
+    
+    session = db_manager.get_session()
+    try:
+        product = session.query(Product).order_by(Product.id).first()
+        original_price = product.price
+        etag, _ = catalog_version.snapshot()
+        
+        product.price = original_price + 1
+        session.commit()
+        try:
+            assert catalog_version.snapshot()[0] != etag
+            snapshot = product_catalog.snapshot()
+            (position,), _ = snapshot.positions([product.id])
+            assert snapshot.product(position)['price'] == original_price + 1
+        finally:
+            product.price = original_price
+            session.commit()
+    finally:
+        db_manager.close_session(session)
+
+def test_change_feed_skips_own_commits():
+    change_feed.poll()
+    session = db_manager.get_session()
+    try:
+        product = session.query(Product).order_by(Product.id).first()
+        original_price = product.price
+        product.price = original_price + 1
+        session.commit()
+        etag, _ = catalog_version.snapshot()
+        assert change_feed.poll() == 0
+        assert catalog_version.snapshot()[0] == etag
+        
+        # A write that bypasses this process's sessions, as another worker's would, is replayed
+        with db_manager.engine.begin() as connection:
+            connection.execute(text('UPDATE products SET price = :price WHERE id = :id'), {'price': original_price, 'id': product.id})
+        assert change_feed.poll() == 1
+        (position,), _ = product_catalog.snapshot().positions([product.id])
+        assert product_catalog.snapshot().product(position)['price'] == original_price
+    finally:
+        db_manager.close_session(session)
+
+def test_version_is_shared_between_processes():
+    # A fresh CatalogVersion stands in for another worker, or this one after a restart
+    assert CatalogVersion().snapshot() == catalog_version.snapshot()
+    
+    response = app.test_client().get('/api/products?limit=1')
+    etag = response.headers['ETag']
+    assert etag == f'"{CatalogVersion().snapshot()[0]}"'
+    assert app.test_client().get('/api/products?limit=1', headers={'If-None-Match': etag}).status_code == 304
+
+if __name__ == '__main__':
+    run_tests(globals(), "Catalog snapshot reads match SQL!")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Check with EXPLAIN QUERY PLAN that endpoint queries are served by indexes
+"""
+
+import re
+
+from testing import is_scratch_database, run_tests, seed_products
+
+from sqlalchemy import event, text
+from flask_jwt_extended import create_access_token
+from datetime import datetime, timedelta
+from models import db_manager, User, ChatSession, ChatMessage
+import app as app_module
+from app import app
+from pagination import encode_cursor
+
+INDEXED_TABLES = ('products', 'chat_sessions', 'chat_messages')
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING)')
+
+def seed_user():
+    """Add a user to a scratch database for the authenticated endpoints."""
+    if not is_scratch_database():
+        return
+    
+    session = db_manager.get_session()
+    try:
+        if session.query(User).count() == 0:
+            user = User(username='indexcheck', email='indexcheck@example.com')
+            user.set_password('indexcheck')
+            session.add(user)
+            session.commit()
+    finally:
+        db_manager.close_session(session)
+
+seed_products()
+seed_user()
+
+def capture_queries(path, token=None):
+    """Call an endpoint and return the SELECT statements it executed."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+    
+    # Exercise the SQL read paths rather than the in-memory catalog snapshot
+    snapshot_reads = app_module.CATALOG_SNAPSHOT_READS
+    app_module.CATALOG_SNAPSHOT_READS = False
+    event.listen(db_manager.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = app.test_client().get(path, headers=headers)
+        assert response.status_code == 200, f"{path} returned {response.status_code}: {response.get_json()}"
+    finally:
+        event.remove(db_manager.engine, 'before_cursor_execute', before_cursor_execute)
+        app_module.CATALOG_SNAPSHOT_READS = snapshot_reads
+    
+    return statements
+
+def full_table_scans(statement, parameters):
+    """Get the indexed tables an EXPLAIN QUERY PLAN shows being scanned without an index."""
+    with db_manager.engine.connect() as connection:
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            plan = [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    
+    scans = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match and match.group(1) in INDEXED_TABLES:
+            scans.append(detail)
+    return scans
+
+def assert_uses_indexes(path, token=None):
+    """Fail if any query behind an endpoint scans a whole table."""
+    statements = capture_queries(path, token)
+    assert statements, f"{path} executed no queries"
+    for statement, parameters in statements:
+        scans = full_table_scans(statement, parameters)
+        assert not scans, f"{path} runs a full table scan {scans} for:\n{statement}"
+
+def auth_token(user_id=1):
+    """Create an access token for a seeded user."""
+    with app.app_context():
+        return create_access_token(identity=str(user_id))
+
+def test_declared_indexes_exist():
+    with db_manager.engine.connect() as connection:
+        names = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    for expected in ('ix_products_category_price', 'ix_products_brand_price', 'ix_products_price',
+                     'ix_products_is_featured', 'ix_products_is_on_sale',
+                     'ix_chat_sessions_user_id_updated_at',
+                     'ix_chat_messages_session_id_timestamp', 'ix_chat_messages_timestamp'):
+        assert expected in names, f"missing index {expected}"
+
+def test_product_listing_uses_indexes():
+    assert_uses_indexes('/api/products?category=laptops&max_price=2000')
+    assert_uses_indexes('/api/products?brand=apple&min_price=100')
+    assert_uses_indexes('/api/products?min_price=100&max_price=500')
+    assert_uses_indexes('/api/products?featured=true')
+    assert_uses_indexes('/api/products?on_sale=true')
+
+def test_chat_history_uses_indexes():
+    assert_uses_indexes('/api/chat/history', auth_token())
+    assert_uses_indexes('/api/chat/history?session_token=missing', auth_token())
+
+def test_chat_sessions_uses_indexes():
+    assert_uses_indexes('/api/chat/sessions', auth_token())
+
+def test_session_message_counts_cover_only_the_page():
+    session = db_manager.get_session()
+    try:
+        user = User(username='pagecheck', email='pagecheck@example.com')
+        user.set_password('pagecheck')
+        session.add(user)
+        session.flush()
+        now = datetime.utcnow()
+        for index, message_count in enumerate((3, 2, 1)):
+            chat_session = ChatSession(user_id=user.id, session_token=f'pagecheck-{index}',
+                                       updated_at=now - timedelta(minutes=index))
+            session.add(chat_session)
+            session.flush()
+            session.add_all([
+                ChatMessage(session_id=chat_session.id, message_type='user', content='hi')
+                for _ in range(message_count)
+            ])
+        session.commit()
+        user_id = user.id
+    finally:
+        db_manager.close_session(session)
+    
+    token = auth_token(user_id)
+    response = app.test_client().get('/api/chat/sessions?limit=2&offset=1', headers={'Authorization': f'Bearer {token}'})
+    sessions = response.get_json()['sessions']
+    assert [(entry['session_token'], entry['message_count']) for entry in sessions] == [('pagecheck-1', 2), ('pagecheck-2', 1)]
+    
+    counts = [statement for statement, _ in capture_queries('/api/chat/sessions?limit=2&offset=1', token)
+              if 'count(chat_messages.id)' in statement]
+    assert counts and all(' IN (' in statement for statement in counts)
+
+def test_invalid_chat_pages_are_rejected():
+    headers = {'Authorization': f'Bearer {auth_token()}'}
+    client = app.test_client()
+    for path in ('/api/chat/sessions?limit=0', '/api/chat/sessions?limit=-1', '/api/chat/sessions?offset=-5',
+                 f"/api/chat/history?cursor={encode_cursor({'timestamp': 5, 'id': 1})}"):
+        assert client.get(path, headers=headers).status_code == 400, path
+    assert client.get('/api/chat/sessions?limit=100000', headers=headers).get_json()['limit'] == app_module.MAX_CHAT_SESSIONS_PAGE
+
+if __name__ == '__main__':
+    run_tests(globals(), "All endpoint queries use indexes!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Check that /api/metrics reports requests and the SQL they ran per route
+"""
+
+import re
+
+from testing import run_tests, seed_products
+
+seed_products()
+
+import app as app_module
+from app import app
+
+def test_metrics_attribute_queries_to_routes():
+    client = app.test_client()
+    
+    # Read from SQL rather than the in-memory catalog snapshot so there are queries to attribute
+    snapshot_reads = app_module.CATALOG_SNAPSHOT_READS
+    app_module.CATALOG_SNAPSHOT_READS = False
+    try:
+        assert client.get('/api/products/1').status_code == 200
+    finally:
+        app_module.CATALOG_SNAPSHOT_READS = snapshot_reads
+    
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    metrics = response.get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/api/products/<int:product_id>",status="200"}' in metrics
+    queries = re.search(r'^http_request_sql_queries_sum\{method="GET",route="/api/products/<int:product_id>"\} (\S+)$',
+                        metrics, re.MULTILINE)
+    assert queries and float(queries.group(1)) >= 1
+
+def test_unmatched_routes_share_a_label():
+    client = app.test_client()
+    client.get('/api/no-such-route/1')
+    client.get('/api/no-such-route/2')
+    metrics = client.get('/api/metrics').get_data(as_text=True)
+    assert 'route="unmatched"' in metrics
+    assert 'no-such-route' not in metrics
+
+if __name__ == '__main__':
+    run_tests(globals(), "Metrics attribute requests and queries to routes!")
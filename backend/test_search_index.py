@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Check that chatbot keyword search finds products by substrings and plurals, as the SQL LIKE search did
+"""
+
+from testing import run_tests, seed_products
+from models import db_manager, Product
+
+seed_products()
+
+from app import app
+from chatbot import chatbot
+from search_index import product_index, singular_forms
+from catalog import product_catalog
+from ranking import ProductRanker
+import numpy as np
+
+def respond(message):
+    """Generate the chatbot's response to a message without saving it."""
+    session = db_manager.get_session()
+    try:
+        return chatbot._generate_response(session, message)
+    finally:
+        db_manager.close_session(session)
+
+def matched_names(keyword):
+    """Names of the products a keyword matches."""
+    session = db_manager.get_session()
+    try:
+        ids = list(product_index.keyword_matches([keyword]))
+        return {name for (name,) in session.query(Product.name).filter(Product.id.in_(ids))}
+    finally:
+        db_manager.close_session(session)
+
+def test_singular_forms():
+    assert singular_forms('phones') == {'phones', 'phone'}
+    assert 'watch' in singular_forms('watches')
+    assert 'accessory' in singular_forms('accessories')
+    assert singular_forms('glass') == {'glass'}
+
+def test_keywords_match_inside_words():
+    phones = matched_names('phone')
+    assert 'iPhone 15 Pro Max' in phones
+    assert 'Samsung Galaxy S24 Ultra' in phones  # category "smartphones"
+    assert 'MacBook Air M2' in matched_names('book')
+    assert 'Apple Watch Ultra 2' in matched_names('watches')
+
+def test_everyday_queries_find_products():
+    for message in ('i need a phone', 'i want a book', 'show me watches'):
+        response = respond(message)
+        assert response['type'] == 'product_list', (message, response['text'])
+
+def test_unmatched_keywords_fall_back_to_filters():
+    response = respond('show me apple laptops qqqqq')
+    assert response['type'] == 'product_list', response['text']
+    assert all(product['brand'] == 'Apple' and product['category'] == 'laptops' for product in response['products'])
+
+def test_ranking_ties_break_by_id():
+    snapshot = product_catalog.snapshot()
+    positions = np.arange(len(snapshot))[::-1]
+    ranker = ProductRanker({name: 0.0 for name in ProductRanker().weights})
+    assert snapshot.ids[ranker.top_k(snapshot, positions, 3)].tolist() == sorted(snapshot.ids.tolist())[:3]
+
+if __name__ == '__main__':
+    run_tests(globals(), "Keyword search finds what the LIKE search did!")
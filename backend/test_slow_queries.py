@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Check that the slow-query log fingerprints statements, redacts parameters and captures query plans
+"""
+
+import os
+import tempfile
+
+from testing import run_tests, seed_products
+from models import db_manager
+
+seed_products()
+
+import app as app_module
+from app import app
+from slow_queries import SlowQueryLog, fingerprint, full_scans, redact
+
+def test_fingerprint_groups_by_shape():
+    key, normalized = fingerprint("SELECT * FROM products WHERE id IN (?, ?, ?) AND name = 'x'  LIMIT 10")
+    assert normalized == 'SELECT * FROM products WHERE id IN (?+) AND name = ? LIMIT ?'
+    assert key == fingerprint('SELECT * FROM products WHERE id IN (?, ?) AND name = ? LIMIT 5')[0]
+
+def test_parameters_are_redacted():
+    assert redact(('secret@example.com', 42, None)) == ['<str:18>', '<int>', None]
+    assert redact({'password': b'abc'}) == {'password': '<bytes:3>'}
+
+def test_full_scans_skip_subqueries():
+    plan = ['CO-ROUTINE counts', 'SCAN chat_messages', 'SCAN counts', 'SEARCH products USING INDEX ix_products_price (price>?)']
+    assert full_scans(plan) == ['chat_messages']
+
+def test_slow_query_log_captures_plans():
+    path = os.path.join(tempfile.mkdtemp(), 'slow_queries.log')
+    slow_log = SlowQueryLog(threshold_ms=0.001, path=path)
+    slow_log.instrument_engine(db_manager.engine)
+    
+    # Read from SQL rather than the in-memory catalog snapshot so there are statements to log
+    snapshot_reads = app_module.CATALOG_SNAPSHOT_READS
+    app_module.CATALOG_SNAPSHOT_READS = False
+    try:
+        app.test_client().get('/api/products?category=laptops&max_price=2000')
+    finally:
+        app_module.CATALOG_SNAPSHOT_READS = snapshot_reads
+        slow_log.close()
+    
+    statements = slow_log.summary(limit=100)['statements']
+    products = [entry for entry in statements if 'FROM products' in entry['statement']]
+    assert products and all(entry['plan'] for entry in products)
+    with open(path) as log_file:
+        log = log_file.read()
+    assert all(entry['fingerprint'] in log for entry in products)
+    assert 'laptops' not in log
+
+if __name__ == '__main__':
+    run_tests(globals(), "Slow queries are logged with their plans!")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Check that chatbot spelling correction fixes typos without rewriting ordinary English words
+"""
+
+from testing import run_tests, seed_products
+from models import db_manager
+
+seed_products()
+
+from app import app
+from chatbot import chatbot
+
+def respond(message):
+    """Generate the chatbot's response to a message without saving it."""
+    session = db_manager.get_session()
+    try:
+        return chatbot._generate_response(session, message)
+    finally:
+        db_manager.close_session(session)
+
+def test_common_words_are_not_corrected():
+    # Each of these used to become a catalog word: live, dell, dell, live, nord
+    for word in ('like', 'well', 'deal', 'give', 'word'):
+        corrected, corrections = chatbot._correct_spelling(f"i {word} headphones")
+        assert corrections == {}, (word, corrections)
+        assert corrected == f"i {word} headphones"
+
+def test_everyday_sentences_keep_their_results():
+    for message in ('show me a good deal on headphones', 'show me headphones that work well'):
+        response = respond(message)
+        assert response['type'] == 'product_list', (message, response['text'])
+        assert 'spelling_corrections' not in response['metadata'], message
+        assert all(product['category'] == 'headphones' for product in response['products']), message
+
+def test_typos_are_still_corrected():
+    corrected, corrections = chatbot._correct_spelling('show me samsnug headphnes')
+    assert corrections == {'samsnug': 'samsung', 'headphnes': 'headphones'}
+    assert corrected == 'show me samsung headphones'
+
+def test_corrections_never_become_filters():
+    _, corrections, classification = chatbot._classify_message('show me samsnug phones')
+    assert corrections == {'samsnug': 'samsung'}
+    assert classification['brands'] == []
+    
+    response = respond('show me samsnug phones')
+    assert response['type'] == 'product_list'
+    assert response['metadata']['spelling_corrections'] == {'samsnug': 'samsung'}
+
+if __name__ == '__main__':
+    run_tests(globals(), "Spelling correction behaves!")
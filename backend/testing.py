@@ -0,0 +1,47 @@
+"""
+Shared setup for the backend test modules: import paths, a scratch database and the script runner.
+
+Import this before models or app so DATABASE_URL points at the scratch database.
+"""
+
+import sys
+import os
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add the backend and database directories to Python path
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, 'database')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Use a scratch database unless one was configured
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_backend.db')}")
+
+from models import db_manager, Product
+from init_db import create_mock_products
+
+def is_scratch_database():
+    """Whether the tests run against a scratch database they may fill with fixtures."""
+    return str(db_manager.engine.url).startswith(f"sqlite:///{tempfile.gettempdir()}")
+
+def seed_products():
+    """Add the mock catalog to a scratch database."""
+    if not is_scratch_database():
+        return
+    
+    session = db_manager.get_session()
+    try:
+        existing = {name for (name,) in session.query(Product.name)}
+        session.add_all([Product(**product) for product in create_mock_products() if product['name'] not in existing])
+        session.commit()
+    finally:
+        db_manager.close_session(session)
+
+def run_tests(namespace, message):
+    """Run a module's test_ functions when it is executed as a script."""
+    tests = [value for name, value in list(namespace.items()) if name.startswith('test_') and callable(value)]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print(f"\n🎉 {message}")
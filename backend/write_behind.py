@@ -0,0 +1,162 @@
+"""
+Write-behind batching of chat message persistence.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from sqlalchemy import insert, update
+from models import ChatMessage, ChatSession, db_manager
+
+logger = logging.getLogger(__name__)
+
+class ChatWriteBehind:
+    """Background writer that batches chat message inserts into one transaction.
+    
+    Exchanges are queued by request threads and written every interval_ms or
+    as soon as batch_rows rows are pending. The queue is bounded: submit()
+    blocks for up to put_timeout_ms and then reports the queue as full so the
+    caller can write synchronously instead. Each exchange carries a key, such as
+    its user id, so readers can wait for just their own pending writes.
+    """
+    
+    def __init__(self, interval_ms=50, batch_rows=500, max_queue=10000, put_timeout_ms=100):
+        self.interval = interval_ms / 1000.0
+        self.batch_rows = batch_rows
+        self.put_timeout = put_timeout_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._written = threading.Condition(self._lock)
+        self._pending = {}
+        self.enqueued = 0
+        self.rejected = 0
+        self.written_rows = 0
+        self.failed_rows = 0
+        self.batches = 0
+        self.last_batch_rows = 0
+    
+    def start(self):
+        """Start the background writer and flush it at interpreter exit."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='chat-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+    
+    def stop(self):
+        """Write everything still queued and stop the background writer."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+    
+    def submit(self, rows, key=None):
+        """Queue ChatMessage rows (dicts) for writing under key; False if the queue stayed full."""
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            self._queue.put((key, rows), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self._release(key)
+                self.rejected += 1
+            return False
+        
+        with self._lock:
+            self.enqueued += 1
+        return True
+    
+    def flush(self, key=None):
+        """Block until the rows queued under key, or with no key every queued row, have been written."""
+        if key is None:
+            self._queue.join()
+            return
+        
+        with self._written:
+            self._written.wait_for(lambda: key not in self._pending)
+    
+    def stats(self):
+        """Get queue depth and write counters."""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self._queue.maxsize,
+                'enqueued': self.enqueued,
+                'rejected': self.rejected,
+                'written_rows': self.written_rows,
+                'failed_rows': self.failed_rows,
+                'batches': self.batches,
+                'last_batch_rows': self.last_batch_rows
+            }
+    
+    def _run(self):
+        """Collect batches until stopped, then drain the queue."""
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            
+            batch = [first]
+            rows = len(first[1])
+            deadline = time.monotonic() + self.interval
+            while rows < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    exchange = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(exchange)
+                rows += len(exchange[1])
+            
+            self._write([exchange_rows for _, exchange_rows in batch])
+            with self._written:
+                for key, _ in batch:
+                    self._release(key)
+                self._written.notify_all()
+            for _ in batch:
+                self._queue.task_done()
+    
+    def _release(self, key):
+        """Count one exchange under key as no longer pending; call with the lock held."""
+        self._pending[key] -= 1
+        if not self._pending[key]:
+            del self._pending[key]
+    
+    def _write(self, batch):
+        """Insert a batch of messages and bump their sessions' updated_at in one transaction."""
+        rows = [row for exchange in batch for row in exchange]
+        
+        latest = {}
+        for row in rows:
+            session_id = row['session_id']
+            if session_id not in latest or row['timestamp'] > latest[session_id]:
+                latest[session_id] = row['timestamp']
+        
+        session = db_manager.get_session()
+        try:
+            session.execute(insert(ChatMessage), rows)
+            for session_id, updated_at in latest.items():
+                session.execute(
+                    update(ChatSession).where(ChatSession.id == session_id).values(updated_at=updated_at)
+                )
+            session.commit()
+            
+            with self._lock:
+                self.written_rows += len(rows)
+                self.batches += 1
+                self.last_batch_rows = len(rows)
+        except Exception:
+            session.rollback()
+            with self._lock:
+                self.failed_rows += len(rows)
+            logger.exception("Failed to write chat message batch of %d rows", len(rows))
+        finally:
+            db_manager.close_session(session)
@@ -173,14 +173,19 @@ class ChatManager {
             // Show typing indicator
             this.showTypingIndicator();
             
-            // Send to backend
-            const response = await this.sendToChatbot(message);
-            
-            // Hide typing indicator
-            this.hideTypingIndicator();
-            
-            // Display bot response
-            this.displayBotResponse(response);
+            // Send to backend, rendering the response as it streams in when supported
+            let response;
+            if (window.ReadableStream && window.TextDecoder) {
+                response = await this.streamFromChatbot(message);
+            } else {
+                response = await this.sendToChatbot(message);
+                
+                // Hide typing indicator
+                this.hideTypingIndicator();
+                
+                // Display bot response
+                this.displayBotResponse(response);
+            }
             
             // Update session token
             if (response.session_token) {
@@ -217,6 +222,59 @@ class ChatManager {
         return response;
     }
 
+    async streamFromChatbot(message) {
+        const data = {
+            message: message,
+            session_token: AppState.currentSessionToken
+        };
+        
+        let textMessage = null;
+        let productsGrid = null;
+        let finalResponse = null;
+        
+        await ApiClient.stream('/chat/stream', data, (event, payload) => {
+            if (event === 'text') {
+                // First visible output: replace the typing indicator with the header
+                this.hideTypingIndicator();
+                textMessage = this.displayMessage(payload.text, 'bot');
+            } else if (event === 'product') {
+                if (!productsGrid) {
+                    productsGrid = this.displayProducts([]);
+                }
+                if (productsGrid) {
+                    productsGrid.appendChild(this.createProductCard(payload));
+                    this.scrollToBottom();
+                }
+            } else if (event === 'done') {
+                finalResponse = payload;
+            }
+        });
+        
+        this.hideTypingIndicator();
+        
+        if (!finalResponse) {
+            throw new Error('The response ended unexpectedly');
+        }
+        
+        // Swap the header for the complete response text
+        const botResponse = finalResponse.response;
+        if (textMessage) {
+            const contentDiv = textMessage.querySelector('.message-content');
+            if (contentDiv) contentDiv.innerHTML = this.formatBotMessage(botResponse.text);
+            
+            const historyEntry = this.messageHistory[this.messageHistory.length - 1];
+            if (historyEntry && historyEntry.type === 'bot') historyEntry.content = botResponse.text;
+        } else {
+            this.displayMessage(botResponse.text, 'bot');
+        }
+        
+        if (botResponse.products && botResponse.products.length > 0) {
+            this.currentProducts = botResponse.products;
+        }
+        
+        return finalResponse;
+    }
+
     displayMessage(content, type) {
         const messagesContainer = DOMUtils.$('#chat-messages');
         if (!messagesContainer) return;
@@ -248,6 +306,8 @@ class ChatManager {
             type,
             timestamp: new Date().toISOString()
         });
+        
+        return messageDiv;
     }
 
     displayBotResponse(response) {
@@ -279,6 +339,8 @@ class ChatManager {
         messagesContainer.appendChild(productsDiv);
         
         this.scrollToBottom();
+        
+        return gridDiv;
     }
 
     createProductCard(product) {
@@ -106,6 +106,61 @@ class ApiClient {
     static async delete(endpoint) {
         return this.request(endpoint, { method: 'DELETE' });
     }
+
+    /**
+     * POST JSON and read a Server-Sent Events response, calling onEvent(event, data) per event.
+     */
+    static async stream(endpoint, data = {}, onEvent = () => {}) {
+        const url = `${API_BASE_URL}${endpoint}`;
+        const headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+        };
+
+        if (AppState.authToken) {
+            headers['Authorization'] = `Bearer ${AppState.authToken}`;
+        }
+
+        const response = await fetch(url, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify(data),
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({
+                error: `HTTP ${response.status}: ${response.statusText}`
+            }));
+            throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let payload = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) payload += line.slice(5).trim();
+                });
+
+                onEvent(event, payload ? JSON.parse(payload) : null);
+            }
+        }
+    }
 }
 
 /**